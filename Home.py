@@ -1,4 +1,5 @@
 import streamlit as st
+import warmup
 
 # --- App Config ---
 st.set_page_config(
@@ -7,6 +8,9 @@ st.set_page_config(
     layout="centered"
 )
 
+# --- Warm up data and models in the background before the first page visit ---
+warmup.start()
+
 # --- Custom Sidebar Logo + Background ---
 st.markdown(
     """
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the Streamlit pages headlessly with ``streamlit.testing.v1.AppTest``.
+
+Each scenario drives one page like a user would (the Calculator through all
+four tabs and the calculate button). It records wall time, the tracemalloc
+peak of every rerun, and the rerun count. Reference data comes from
+``bench/fixtures`` instead of the Drive/GitHub URLs, and the chatbot models are
+not loaded, so runs are offline and repeatable.
+
+    python bench/apptest_bench.py --iterations 5 --output bench/results.json
+    python bench/apptest_bench.py --sessions 8 --iterations 3        # 8 parallel sessions (processes)
+    python bench/apptest_bench.py --baseline bench/results.json      # exit 1 on p50 regressions
+
+Results are JSON: run metadata plus, per scenario and step, count / mean / p50 /
+p95 / max milliseconds and peak MB.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, ROOT_DIR)
+
+# Keep caches and history out of the working tree (read at import by data_cache / history_store)
+_scratch = tempfile.mkdtemp(prefix="greenprint-bench-")
+os.environ.setdefault("GREENPRINT_CACHE_DIR", os.path.join(_scratch, "data_cache"))
+os.environ.setdefault("GREENPRINT_HISTORY_DB", os.path.join(_scratch, "history.sqlite3"))
+
+import footprint_engine  # noqa: E402
+import warmup  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+
+def use_fixtures():
+    """Point the warm-up loaders at local files and skip the chatbot models."""
+    footprint_engine.CSV_URL = os.path.join(FIXTURES, "emission_factors.csv")
+    warmup.PER_CAPITA_URL = os.path.join(FIXTURES, "per_capita.csv")
+    warmup.TASKS["logo"] = lambda: open(os.path.join(ROOT_DIR, "GreenPrint_logo.png"), "rb").read()
+    for name in ("chatbot_index", "llm", "kaleido"):
+        warmup.TASKS[name] = lambda: None
+
+
+# --- Recording ---
+class Recorder:
+    """Times each rerun of one session; ``step`` names what the user just did."""
+
+    def __init__(self, scenario, trace_memory):
+        self.scenario = scenario
+        self.trace_memory = trace_memory
+        self.samples = []  # (scenario, step, seconds, peak bytes or None)
+
+    def run(self, step, target):
+        """``target`` is the AppTest or a widget (``.run()`` reruns the script)."""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        at = target.run()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        if at.exception:
+            raise RuntimeError(f"{self.scenario}/{step}: {at.exception[0].message}")
+        self.samples.append((self.scenario, step, elapsed, peak))
+        return at
+
+
+def _page(name, timeout):
+    path = os.path.join(ROOT_DIR, name) if name == "Home.py" else os.path.join(ROOT_DIR, "pages", name)
+    return AppTest.from_file(path, default_timeout=timeout)
+
+
+# --- Scenarios: each takes a Recorder and drives one fresh session ---
+def home(rec, timeout):
+    rec.run("load", _page("Home.py", timeout))
+
+
+def profile(rec, timeout):
+    at = rec.run("load", _page("1_Profile.py", timeout))
+    at.text_input(key="name").input("Bench User")
+    at.number_input(key="age").set_value(34)
+    at.selectbox(key="gender").select("Female")
+    at.text_input(key="email").input("bench@example.org")
+    at.checkbox(key="consent").check()
+    rec.run("submit", at.button[0].click())
+
+
+def calculator(rec, timeout, country="Germany"):
+    at = rec.run("load", _page("2_Calculator.py", timeout))
+    at = rec.run("select_country", at.selectbox(key="country_selector_main").select(country))
+    tabs = at.radio(key="tab_selector").options
+    for tab_index, tab in enumerate(tabs):
+        if tab_index:
+            at = rec.run(f"tab_{tab_index}", at.radio(key="tab_selector").set_value(tab))
+        for widget in at.number_input[:3]:
+            at = rec.run(f"input_tab_{tab_index}", widget.set_value(widget.value + 2.0))
+    at = rec.run("review", at.checkbox(key="review_final_check").check())
+    rec.run("calculate", at.button(key="calculate_final_button").click())
+
+
+def sample_footprint(country="Germany"):
+    """A filled-in ``FootprintState``, as the Calculator leaves it for the Breakdown page."""
+    _, _, factor_matrix, _ = warmup.get("reference_data")
+    footprint = footprint_engine.FootprintState(
+        country, footprint_engine.activity_factors(factor_matrix, footprint_engine.ACTIVITIES, country))
+    for activity, quantity in {"Petrol_car": 600, "Beef": 3, "Dairy": 8, "Electricity": 250, "Hotel_stay": 2}.items():
+        footprint.set_quantity(activity, quantity)
+    return footprint
+
+
+def breakdown(rec, timeout, country="Germany"):
+    at = _page("3_breakdown.py", timeout)
+    at.session_state.footprint = sample_footprint(country)
+    at = rec.run("load", at)
+    rec.run("rerun", at)
+
+
+SCENARIOS = {"home": home, "profile": profile, "calculator": calculator, "breakdown": breakdown}
+
+
+# --- Summaries ---
+def summarise(samples):
+    grouped = {}
+    for scenario, step, seconds, peak in samples:
+        grouped.setdefault(scenario, {}).setdefault(step, []).append((seconds, peak))
+    summary = {}
+    for scenario, steps in grouped.items():
+        summary[scenario] = {}
+        for step, values in steps.items():
+            ms = np.array([seconds for seconds, _ in values]) * 1000
+            peaks = [peak for _, peak in values if peak is not None]
+            summary[scenario][step] = {
+                "reruns": len(values),
+                "mean_ms": round(float(ms.mean()), 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "max_ms": round(float(ms.max()), 2),
+                "peak_mb": round(max(peaks) / 1e6, 2) if peaks else None,
+            }
+        scenario_ms = [s["mean_ms"] * s["reruns"] for s in summary[scenario].values()]
+        summary[scenario]["_session"] = {"reruns": sum(s["reruns"] for s in summary[scenario].values()),
+                                         "total_ms": round(sum(scenario_ms), 2)}
+    return summary
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Steps whose p50 grew by more than ``tolerance`` (fraction) relative to ``baseline``."""
+    regressions = []
+    for scenario, steps in results["scenarios"].items():
+        for step, stats in steps.items():
+            before = baseline.get("scenarios", {}).get(scenario, {}).get(step, {}).get("p50_ms")
+            if before and "p50_ms" in stats and stats["p50_ms"] > before * (1 + tolerance):
+                regressions.append(f"{scenario}/{step}: p50 {before:.1f} -> {stats['p50_ms']:.1f} ms")
+    return regressions
+
+
+def _prepare(scenarios, timeout, warmup_runs):
+    use_fixtures()
+    warmup.get("reference_data")  # load fixtures once, like a warm server
+    for _ in range(warmup_runs):   # first runs pay for imports and compile caches
+        for name in scenarios:
+            SCENARIOS[name](Recorder(name, False), timeout)
+
+
+def _session(scenarios, iterations, timeout, trace_memory, warmup_runs):
+    """One simulated user session; returns its samples (runs in a worker process when sessions > 1)."""
+    _prepare(scenarios, timeout, warmup_runs)
+    samples = []
+    if trace_memory:
+        tracemalloc.start()
+    for _ in range(iterations):
+        for name in scenarios:
+            rec = Recorder(name, trace_memory)
+            SCENARIOS[name](rec, timeout)
+            samples.extend(rec.samples)
+    if trace_memory:
+        tracemalloc.stop()
+    return samples
+
+
+def run(scenarios, iterations=3, sessions=1, timeout=120, trace_memory=True, warmup_runs=1):
+    # AppTest owns a process-wide runtime, so parallel sessions are separate processes competing
+    # for the same CPUs rather than threads of one server
+    start = time.perf_counter()
+    if sessions == 1:
+        samples = _session(scenarios, iterations, timeout, trace_memory, warmup_runs)
+    else:
+        with ProcessPoolExecutor(max_workers=sessions, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_session, scenarios, iterations, timeout, trace_memory, warmup_runs)
+                       for _ in range(sessions)]
+            samples = [sample for future in futures for sample in future.result()]
+    wall = time.perf_counter() - start
+
+    import streamlit
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": iterations,
+            "sessions": sessions,
+            "tracemalloc": trace_memory,
+        },
+        "wall_s": round(wall, 3),  # includes each session's warm-up runs
+        "reruns_per_s": round(len(samples) / wall, 2) if wall else None,
+        "scenarios": summarise(samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AppTest load and latency benchmark for the GreenPrint pages.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), default=None,
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--iterations", type=int, default=3, help="Runs of each scenario per session")
+    parser.add_argument("--sessions", type=int, default=1, help="Parallel sessions (one worker process each)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per rerun")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip peak-memory tracking (lower overhead)")
+    parser.add_argument("--output", default=None, help="Write the JSON results here")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON; exit 1 on p50 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown vs the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.scenario or list(SCENARIOS), iterations=args.iterations, sessions=args.sessions,
+                  timeout=args.timeout, trace_memory=not args.no_tracemalloc)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Import-time budget per page, from ``python -X importtime``.
+
+Each page runs once, headless, in a fresh interpreter on the fixture data (see
+``apptest_bench.py``). Streamlit, pandas and the warm-up module are imported
+before the page starts, as on a running server. Everything the page script
+imports after that is its own cost. The report lists the first run's wall time,
+the page's total import time and its most expensive top-level packages.
+
+    python bench/import_budget.py                       # all pages, default budgets
+    python bench/import_budget.py --page 4_Chatbot.py --top 20
+    python bench/import_budget.py --budget 3_breakdown.py=400 --output imports.json
+
+Exits 1 when a page's import time exceeds its budget (milliseconds).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+PAGES = ("Home.py", "1_Profile.py", "2_Calculator.py", "3_breakdown.py", "4_Chatbot.py")
+
+# Milliseconds of imports a page may add on top of the server baseline before its first paint
+DEFAULT_BUDGETS = {
+    "Home.py": 150,
+    "1_Profile.py": 150,
+    "2_Calculator.py": 200,
+    "3_breakdown.py": 350,
+    "4_Chatbot.py": 150,
+}
+
+_MARKER = "import_budget: page start"
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """(module, self us, cumulative us, depth) for each import logged after the page started."""
+    _, _, after = stderr.partition(_MARKER)
+    entries = []
+    for line in after.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def summarise(entries, top=10):
+    """Total import ms (top-level imports only) and the packages costing the most self time."""
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    by_package = {}
+    for module, self_us, _, _ in entries:
+        package = module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "import_ms": round(total_us / 1000, 1),
+        "modules": len(entries),
+        "packages": {package: round(us / 1000, 1) for package, us in ranked},
+    }
+
+
+def _child(page):
+    """Run one page once; importtime lines after the marker belong to the page."""
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import apptest_bench
+
+    apptest_bench.use_fixtures()
+    apptest_bench.warmup.get("reference_data")
+    path = os.path.join(ROOT_DIR, page) if page == "Home.py" else os.path.join(ROOT_DIR, "pages", page)
+    at = apptest_bench.AppTest.from_file(path, default_timeout=120)
+    if page == "3_breakdown.py":  # render the charts rather than the "no data" warning
+        at.session_state.footprint = apptest_bench.sample_footprint()
+    sys.stderr.write(f"{_MARKER}\n")
+    sys.stderr.flush()
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"first_run_ms": round(elapsed * 1000, 1),
+                      "exception": at.exception[0].message if at.exception else None}))
+
+
+def measure(page, top=10):
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", page],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{page}: {result.stderr.strip().splitlines()[-1:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report.update(summarise(parse_importtime(result.stderr), top=top))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-page import-time budget check for the GreenPrint pages.")
+    parser.add_argument("--page", action="append", choices=PAGES, default=None,
+                        help="Page to measure (repeatable; default: all)")
+    parser.add_argument("--budget", action="append", default=[], metavar="PAGE=MS",
+                        help="Override a page's import budget in milliseconds")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per page")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in args.budget:
+        page, _, ms = item.partition("=")
+        if page not in budgets or not ms:
+            parser.error(f"--budget expects PAGE=MS with PAGE one of {', '.join(PAGES)}")
+        budgets[page] = float(ms)
+
+    reports, over = {}, []
+    for page in args.page or PAGES:
+        report = measure(page, top=args.top)
+        report["budget_ms"] = budgets[page]
+        reports[page] = report
+        if report["import_ms"] > budgets[page]:
+            over.append(f"{page}: imports {report['import_ms']:.0f} ms > budget {budgets[page]:.0f} ms")
+        print(f"{page:<16} first run {report['first_run_ms']:>8.1f} ms   imports {report['import_ms']:>7.1f} ms "
+              f"(budget {budgets[page]:.0f})   " + ", ".join(f"{p} {ms:.0f}" for p, ms in list(report["packages"].items())[:5]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(reports, indent=2) + "\n")
+    for line in over:
+        print(f"OVER BUDGET {line}", file=sys.stderr)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
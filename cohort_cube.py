@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Pre-aggregated cohort statistics for "how do I compare" queries.
+
+Every recorded footprint updates one cell per (country, age band, gender)
+key and also the seven roll-ups where any of those is "all" (``None``). A cell
+keeps count, sum, sum of squares and a fixed log-spaced histogram of totals.
+Mean and standard deviation come from the sums, and percentiles from one pass
+over ~250 histogram bins. Query cost therefore does not depend on how many
+footprints have been recorded.
+
+The cube is rebuilt from ``history_store`` with one scan at start-up, then kept
+current as the store commits each batch (``HistoryStore.add_listener``).
+"""
+import itertools
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+# Upper bounds of each age band ("65+" is open-ended)
+AGE_BAND_EDGES = np.array([18, 25, 35, 45, 55, 65])
+AGE_BANDS = ("<18", "18-24", "25-34", "35-44", "45-54", "55-64", "65+")
+UNKNOWN = "unknown"
+
+# kg CO2 per month: 0, then 1 .. 100,000 in 256 log-spaced steps (~4.6% wide bins)
+DEFAULT_BIN_EDGES = np.concatenate([[0.0], np.geomspace(1.0, 100_000.0, 256)])
+
+_DIMENSIONS = ("country", "age_band", "gender")
+# All 8 subsets of the dimensions that a cell can be keyed by
+_ROLLUPS = [dims for r in range(len(_DIMENSIONS) + 1) for dims in itertools.combinations(_DIMENSIONS, r)]
+
+
+def age_band(age):
+    """Age band label for an age in years; missing ages are "unknown"."""
+    if age is None or pd.isna(age):
+        return UNKNOWN
+    return AGE_BANDS[int(np.searchsorted(AGE_BAND_EDGES, age, side="right"))]
+
+
+class CohortCube:
+    """count / sum / sum of squares / histogram per (country, age band, gender) and their roll-ups."""
+
+    def __init__(self, bin_edges=DEFAULT_BIN_EDGES, capacity=64):
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        n_bins = len(self.bin_edges) - 1
+        self._cells = {}  # (country, age_band, gender) with None for "all" -> row
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._sum = np.zeros(capacity)
+        self._sumsq = np.zeros(capacity)
+        self._hist = np.zeros((capacity, n_bins), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Number of footprints in the cube."""
+        cell = self._cell(None, None, None)
+        return 0 if cell is None else cell[0]
+
+    # --- Updates ---
+    def _row(self, key):
+        row = self._cells.get(key)
+        if row is None:
+            row = len(self._cells)
+            if row == len(self._count):  # grow by doubling
+                self._count = np.concatenate([self._count, np.zeros_like(self._count)])
+                self._sum = np.concatenate([self._sum, np.zeros_like(self._sum)])
+                self._sumsq = np.concatenate([self._sumsq, np.zeros_like(self._sumsq)])
+                self._hist = np.concatenate([self._hist, np.zeros_like(self._hist)])
+            self._cells[key] = row
+        return row
+
+    def add_many(self, countries, ages, genders, totals):
+        """Add a batch of footprints (array-likes of equal length)."""
+        frame = pd.DataFrame({
+            "country": pd.Series(countries, dtype=object).fillna(UNKNOWN).to_numpy(),
+            "age_band": [age_band(age) for age in ages],
+            "gender": pd.Series(genders, dtype=object).fillna(UNKNOWN).to_numpy(),
+            "total": np.asarray(totals, dtype=np.float64),
+        })
+        if frame.empty:
+            return
+        frame["bin"] = np.clip(np.searchsorted(self.bin_edges, frame["total"], side="right") - 1,
+                               0, len(self.bin_edges) - 2)
+        frame["total_sq"] = frame["total"] ** 2
+
+        with self._lock:
+            for dims in _ROLLUPS:
+                grouped = frame.groupby([*dims, "bin"])
+                sums = grouped[["total", "total_sq"]].sum()
+                for (group, count), (total, total_sq) in zip(grouped.size().items(), sums.itertuples(index=False)):
+                    group = group if isinstance(group, tuple) else (group,)
+                    values = dict(zip(dims, group[:-1]))
+                    row = self._row(tuple(values.get(d) for d in _DIMENSIONS))
+                    self._count[row] += count
+                    self._hist[row, group[-1]] += count
+                    self._sum[row] += total
+                    self._sumsq[row] += total_sq
+
+    def add_rows(self, rows):
+        """``HistoryStore`` listener: rows are tuples in ``history_store._ROW_COLUMNS`` order."""
+        if rows:
+            _, _, _, countries, ages, genders, *_ = zip(*rows)
+            self.add_many(countries, ages, genders, [row[-1] for row in rows])
+
+    @classmethod
+    def from_history(cls, path, chunksize=200_000, **kwargs):
+        """Build the cube with one scan of the history database."""
+        cube = cls(**kwargs)
+        if not os.path.exists(path):  # no history recorded yet
+            return cube
+        with closing(sqlite3.connect(path, timeout=30)) as conn:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'footprints'").fetchone()
+            if exists:
+                query = "SELECT country, age, gender, total FROM footprints"
+                for chunk in pd.read_sql_query(query, conn, chunksize=chunksize):
+                    cube.add_many(chunk["country"], chunk["age"], chunk["gender"], chunk["total"])
+        return cube
+
+    # --- Queries ---
+    def _cell(self, country, band, gender):
+        """(count, sum, sumsq, histogram copy) of a non-empty cell, read under the lock, else None.
+
+        ``add_many`` updates a row in several steps on the history writer thread (and may
+        replace the arrays when they grow), so readers copy the row before computing on it.
+        """
+        with self._lock:
+            row = self._cells.get((country, band, gender))
+            if row is None or self._count[row] == 0:
+                return None
+            return int(self._count[row]), float(self._sum[row]), float(self._sumsq[row]), self._hist[row].copy()
+
+    def stats(self, country=None, age_band=None, gender=None):
+        """{"count", "mean", "std"} of a cell (``None`` = all), or None if it is empty."""
+        cell = self._cell(country, age_band, gender)
+        if cell is None:
+            return None
+        count, total, total_sq, _ = cell
+        mean = total / count
+        variance = max(total_sq / count - mean ** 2, 0.0)
+        return {"count": count, "mean": float(mean), "std": float(np.sqrt(variance))}
+
+    def percentile(self, value, country=None, age_band=None, gender=None):
+        """Percentage (0-100) of the cell's footprints at or below ``value``, or None if it is empty."""
+        cell = self._cell(country, age_band, gender)
+        if cell is None:
+            return None
+        count, _, _, hist = cell
+        b = int(np.clip(np.searchsorted(self.bin_edges, value, side="right") - 1, 0, len(hist) - 1))
+        lo, hi = self.bin_edges[b], self.bin_edges[b + 1]
+        within = np.clip((value - lo) / (hi - lo), 0.0, 1.0)  # linear inside the bin
+        below = hist[:b].sum() + hist[b] * within
+        return float(100.0 * below / count)
+
+    def quantile(self, q, country=None, age_band=None, gender=None):
+        """Approximate ``q``-quantile (0-1) of a cell's totals, or None if it is empty."""
+        cell = self._cell(country, age_band, gender)
+        if cell is None:
+            return None
+        hist = cell[3]
+        cumulative = np.cumsum(hist)
+        target = q * cumulative[-1]
+        b = int(np.searchsorted(cumulative, target, side="left"))
+        before = cumulative[b - 1] if b else 0
+        within = (target - before) / max(hist[b], 1)
+        return float(self.bin_edges[b] + within * (self.bin_edges[b + 1] - self.bin_edges[b]))
+
+    def best_cell(self, country, age_band=None, gender=None, min_count=20):
+        """Most specific (country, age band, gender) roll-up with at least ``min_count`` footprints."""
+        candidates = [(country, age_band, gender), (country, age_band, None), (country, None, gender),
+                      (country, None, None), (None, None, None)]
+        with self._lock:
+            for key in candidates:
+                row = self._cells.get(key)
+                if row is not None and self._count[row] >= min_count:
+                    return key
+        return None
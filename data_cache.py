@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Local, versioned snapshots of the reference CSVs.
+
+The first load downloads a table and writes it under ``DATA_CACHE_DIR`` as
+
+    <name>/<sha256[:16]>/values.npy   numeric columns, float64, memory-mapped on read
+    <name>/<sha256[:16]>/meta.json    hash, source, column order/dtypes, text columns
+    <name>/CURRENT                    name of the live snapshot directory
+
+Later loads read the snapshot from disk and, at most once per
+``REFRESH_INTERVAL``, check upstream for changes in a background thread; a
+changed table becomes the live snapshot and is served from the next load.
+A cold start never waits on the network and an upstream outage only means
+slightly stale data.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+DATA_CACHE_DIR = os.environ.get("GREENPRINT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data_cache"))
+FETCH_TIMEOUT = 30  # seconds
+REFRESH_INTERVAL = float(os.environ.get("GREENPRINT_REFRESH_INTERVAL", 3600))  # seconds between upstream checks
+
+_refresh_lock = threading.Lock()
+_last_checked = {}  # table name -> time.monotonic() when its last upstream check started
+_refreshing = set()
+
+
+# --- Fetching ---
+def _fetch(url):
+    if os.path.exists(url):
+        with open(url, "rb") as f:
+            return f.read()
+    with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+        return response.read()
+
+
+def _table_dir(name):
+    return os.path.join(DATA_CACHE_DIR, name)
+
+
+def current_version(name):
+    """Snapshot directory name of the live version, or None if nothing is cached."""
+    try:
+        with open(os.path.join(_table_dir(name), "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# --- Snapshot I/O ---
+def _write_snapshot(name, url, raw):
+    digest = hashlib.sha256(raw).hexdigest()
+    version = digest[:16]
+    table_dir = _table_dir(name)
+    snapshot_dir = os.path.join(table_dir, version)
+    if os.path.isdir(snapshot_dir):
+        return version
+
+    df = pd.read_csv(BytesIO(raw))
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    text = [col for col in df.columns if col not in numeric]
+    meta = {
+        "sha256": digest,
+        "source": url,
+        "fetched_at": time.time(),
+        "columns": list(df.columns),
+        "dtypes": {col: str(df[col].dtype) for col in numeric},
+        "text": {col: [None if pd.isna(v) else str(v) for v in df[col]] for col in text},
+    }
+
+    # Write into a temp dir and rename, so readers never see a half-written snapshot
+    tmp_dir = f"{snapshot_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, "values.npy"), df[numeric].to_numpy(dtype=np.float64).reshape(len(df), len(numeric)))
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    try:
+        os.replace(tmp_dir, snapshot_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # another worker won the race
+    return version
+
+
+def _set_current(name, version):
+    table_dir = _table_dir(name)
+    tmp_path = os.path.join(table_dir, f"CURRENT.tmp-{os.getpid()}-{threading.get_ident()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(table_dir, "CURRENT"))
+
+
+def _read_snapshot(name, version):
+    snapshot_dir = os.path.join(_table_dir(name), version)
+    with open(os.path.join(snapshot_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    values = np.load(os.path.join(snapshot_dir, "values.npy"), mmap_mode="r")
+
+    columns = {}
+    numeric_pos = 0
+    for col in meta["columns"]:
+        if col in meta["text"]:
+            columns[col] = pd.Series(meta["text"][col], dtype=object)
+        else:
+            series = pd.Series(values[:, numeric_pos])
+            dtype = meta["dtypes"][col]
+            if dtype != "float64" and not series.isna().any():
+                series = series.astype(dtype)
+            columns[col] = series
+            numeric_pos += 1
+    return pd.DataFrame(columns, columns=meta["columns"])
+
+
+def _prune(name, keep):
+    table_dir = _table_dir(name)
+    for entry in os.listdir(table_dir):
+        path = os.path.join(table_dir, entry)
+        if entry not in keep and os.path.isdir(path) and ".tmp-" not in entry:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# --- Public API ---
+def refresh_table(name, url):
+    """Download ``url`` and make it the live snapshot if its content changed.
+
+    Returns True when a new version was installed. The previous version is
+    kept on disk so readers that already opened it are unaffected.
+    """
+    raw = _fetch(url)
+    previous = current_version(name)
+    version = _write_snapshot(name, url, raw)
+    if version == previous:
+        return False
+    _set_current(name, version)
+    _prune(name, keep={version, previous})
+    return True
+
+
+def _refresh_in_background(name, url):
+    """Start an upstream check unless one is running or the last one began under ``REFRESH_INTERVAL`` ago.
+
+    Returns the started thread, or None.
+    """
+    now = time.monotonic()
+    with _refresh_lock:
+        last = _last_checked.get(name)
+        if name in _refreshing or (last is not None and now - last < REFRESH_INTERVAL):
+            return None
+        _last_checked[name] = now
+        _refreshing.add(name)
+
+    def run():
+        try:
+            refresh_table(name, url)
+        except Exception as e:
+            print(f"Background refresh of '{name}' failed: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(name)
+
+    thread = threading.Thread(target=run, name=f"refresh-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def load_table(name, url, refresh=True):
+    """Load a reference table from the local snapshot, fetching it on first use.
+
+    With ``refresh`` set, a background thread checks ``url`` for a newer
+    version when the last check is more than ``REFRESH_INTERVAL`` old; the
+    caller is never blocked on it.
+    """
+    version = current_version(name)
+    if version is None:
+        with _refresh_lock:
+            _last_checked[name] = time.monotonic()
+        refresh_table(name, url)
+        version = current_version(name)
+    elif refresh:
+        _refresh_in_background(name, url)
+    return _read_snapshot(name, version)
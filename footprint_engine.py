@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Headless carbon footprint engine.
+
+Shared by the Calculator page and by batch scoring of survey exports:
+
+    python footprint_engine.py survey.csv scored.csv --country-col Country
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from taxonomy import ACTIVITY_IDS, BY_ID, CATEGORY_INDEX, CATEGORY_KEYS, category_totals, to_vector
+
+# --- Emission factor source ---
+CSV_URL = "https://drive.google.com/uc?export=download&id=1PWeBZKB6adZKORvtMDLFwCX__gfzH33g"
+
+# --- Activity lists per calculator tab (see taxonomy.py) ---
+ACTIVITIES = list(ACTIVITY_IDS)
+
+# Activity x category membership, so category totals of a user table are one matrix product
+_CATEGORY_MEMBERSHIP = np.eye(len(CATEGORY_KEYS))[CATEGORY_INDEX]
+
+
+# --- Factor Matrix ---
+def build_factor_matrix(df_emis):
+    """Compact activity x country factor matrix: (factors, activity_index, country_index).
+
+    Missing or non-numeric factors stay NaN, so callers can tell a gap in the data from a zero factor.
+    """
+    countries = [col for col in df_emis.columns if col != "Activity"]
+    factors = df_emis[countries].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    activity_index = {}
+    for row, activity in enumerate(df_emis["Activity"]):
+        activity_index.setdefault(activity, row)  # first row wins, like .iloc[0]
+    country_index = {country: col for col, country in enumerate(countries)}
+    return factors, activity_index, country_index
+
+
+def load_factor_matrix(csv_path=CSV_URL):
+    df_emis = pd.read_csv(csv_path)
+    df_emis.columns = df_emis.columns.str.strip()
+    if "Activity" not in df_emis.columns:
+        raise ValueError("Emission data CSV is missing 'Activity' column.")
+    return build_factor_matrix(df_emis)
+
+
+def activity_factors(factor_matrix, activities, country, missing=0.0):
+    """Factor column for one country; activities missing from the CSV get 0.0.
+
+    Gaps (no factor for this country, or an unknown country) get ``missing``: 0.0 for scoring,
+    ``np.nan`` where a gap has to stay distinguishable from a zero factor.
+    """
+    factors, activity_index, country_index = factor_matrix
+    col = country_index.get(country)
+    if col is None:
+        return np.full(len(activities), missing, dtype=np.float64)
+    rows = np.array([activity_index.get(activity, -1) for activity in activities], dtype=np.intp)
+    return np.nan_to_num(np.where(rows >= 0, factors[rows, col], 0.0), nan=missing)
+
+
+def factor_table(factor_matrix, activities=ACTIVITIES):
+    """(len(activities) x n_countries) factors; activities missing from the CSV get 0.0, gaps stay NaN."""
+    factors, activity_index, _ = factor_matrix
+    rows = np.array([activity_index.get(activity, -1) for activity in activities], dtype=np.intp)
+    return np.where(rows[:, np.newaxis] >= 0, factors[rows], 0.0)
+
+
+def country_sweep(quantities, factor_matrix):
+    """Totals of one registry-ordered quantity vector under every country's factors, lowest first.
+
+    Countries missing a factor for any activity with a nonzero quantity are left out, rather than
+    counting that activity as zero emissions.
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    table = factor_table(factor_matrix)
+    complete = ~(np.isnan(table) & (quantities != 0)[:, np.newaxis]).any(axis=0)
+    totals = quantities @ np.nan_to_num(table[:, complete], nan=0.0)
+    countries = [country for country, keep in zip(factor_matrix[2], complete) if keep]
+    return pd.Series(totals, index=countries, name="total").sort_values(kind="stable")
+
+
+# --- Per-capita Averages ---
+EU_NAME = "European Union (27)"
+WORLD_NAME = "World"
+
+
+class PerCapitaIndex:
+    """Monthly per-capita averages indexed once at load time.
+
+    Averages are a country -> value dict with the EU and World values pulled
+    out; ``sorted_averages`` holds the national averages in ascending order, so
+    a footprint's percentile among countries is one binary search.
+    """
+
+    __slots__ = ("averages", "eu", "world", "sorted_averages")
+
+    def __init__(self, averages):
+        self.averages = dict(averages)
+        self.eu = self.averages.get(EU_NAME)
+        self.world = self.averages.get(WORLD_NAME)
+        national = [value for country, value in self.averages.items() if country not in (EU_NAME, WORLD_NAME)]
+        self.sorted_averages = np.sort(np.array(national, dtype=np.float64))
+
+    @classmethod
+    def from_frame(cls, df_cap):
+        """Index a ``Country``/``PerCapitaCO2`` table; missing columns give an empty index."""
+        if df_cap is None or "Country" not in df_cap.columns or "PerCapitaCO2" not in df_cap.columns:
+            return cls({})
+        values = pd.to_numeric(df_cap["PerCapitaCO2"], errors="coerce")
+        averages = {}
+        for country, value in zip(df_cap["Country"], values):
+            if pd.notna(value):
+                averages.setdefault(country, float(value))  # first row wins, like .iloc[0]
+        return cls(averages)
+
+    def average(self, country):
+        return self.averages.get(country)
+
+    def percentile(self, value):
+        """Percentage (0-100) of countries whose average is at or below ``value``; None without data."""
+        if not len(self.sorted_averages):
+            return None
+        return 100.0 * np.searchsorted(self.sorted_averages, value, side="right") / len(self.sorted_averages)
+
+    def rank(self, country):
+        """1-based position of ``country``'s average among countries, lowest first; None if unknown."""
+        average = self.averages.get(country)
+        if average is None or country in (EU_NAME, WORLD_NAME):
+            return None
+        return int(np.searchsorted(self.sorted_averages, average, side="left")) + 1
+
+
+# --- Scoring ---
+def score_quantities(quantities, countries, factor_matrix):
+    """Emissions for an (n_users x len(ACTIVITIES)) quantity array.
+
+    Users whose country has no factor column get NaN emissions.
+    """
+    factors, activity_index, country_index = factor_matrix
+    quantities = np.asarray(quantities, dtype=np.float64)
+    rows = np.array([activity_index.get(activity, -1) for activity in ACTIVITIES], dtype=np.intp)
+    cols = np.array([country_index.get(country, -1) for country in countries], dtype=np.intp)
+
+    user_factors = np.nan_to_num(factors[rows[np.newaxis, :], cols[:, np.newaxis]], nan=0.0)
+    user_factors[:, rows < 0] = 0.0
+    user_factors[cols < 0, :] = np.nan
+    return quantities * user_factors
+
+
+def score_table(users, factor_matrix, country_col="Country", id_cols=()):
+    """Score a table of users x activity quantities in one vectorized pass.
+
+    Missing activity columns count as zero. Returns one row per user with the
+    id columns, one emission column per activity, ``<category>_total`` columns
+    and ``total``.
+    """
+    if country_col not in users.columns:
+        raise ValueError(f"Input is missing the '{country_col}' column.")
+    quantities = users.reindex(columns=ACTIVITIES).apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    emissions = score_quantities(quantities.to_numpy(), users[country_col].to_numpy(), factor_matrix)
+
+    result = pd.DataFrame(emissions, columns=ACTIVITIES, index=users.index)
+    totals = emissions @ _CATEGORY_MEMBERSHIP
+    for i, category in enumerate(CATEGORY_KEYS):
+        result[f"{category}_total"] = totals[:, i]
+    result["total"] = emissions.sum(axis=1)
+
+    if id_cols:
+        result = pd.concat([users[list(id_cols)], result], axis=1)
+    return result
+
+
+def score_user(quantities, factor_matrix, country):
+    """Footprint of one user from an {activity: quantity} dict."""
+    emissions = score_quantities(to_vector(quantities)[np.newaxis, :], [country], factor_matrix)[0]
+    return {
+        "activities": dict(zip(ACTIVITIES, emissions.tolist())),
+        "categories": dict(zip(CATEGORY_KEYS, category_totals(emissions).tolist())),
+        "total": float(emissions.sum()),
+    }
+
+
+# --- Session State ---
+class FootprintState:
+    """One calculator session: quantities, factors and emissions as arrays in taxonomy order.
+
+    ``category_totals`` and ``total`` are kept up to date by ``set_quantity``
+    (one bincount over the emissions, a few dozen elements), so reading them
+    is O(1) however often the inputs change. They are summed afresh rather
+    than moved by deltas, so clearing every input gives exactly 0.0.
+    """
+
+    __slots__ = ("country", "quantities", "factors", "emissions", "category_totals", "total")
+
+    def __init__(self, country=None, factors=None):
+        self.country = country
+        self.quantities = np.zeros(len(ACTIVITY_IDS))
+        self.factors = np.zeros(len(ACTIVITY_IDS)) if factors is None else np.asarray(factors, dtype=np.float64)
+        self._recompute()
+
+    def _recompute(self):
+        self.emissions = self.quantities * self.factors
+        self.category_totals = category_totals(self.emissions)
+        self.total = float(self.category_totals.sum())
+
+    def set_factors(self, country, factors):
+        """Switch to ``country``'s factor column (registry order) and recompute everything."""
+        self.country = country
+        self.factors = np.asarray(factors, dtype=np.float64)
+        self._recompute()
+
+    def set_quantity(self, activity_id, quantity):
+        """Update one input; returns True if it changed."""
+        i = BY_ID[activity_id].index
+        quantity = float(quantity)
+        if quantity == self.quantities[i]:
+            return False
+        self.quantities[i] = quantity
+        self.emissions[i] = quantity * self.factors[i]
+        self.category_totals = category_totals(self.emissions)
+        self.total = float(self.category_totals.sum())
+        return True
+
+    def quantity(self, activity_id):
+        return float(self.quantities[BY_ID[activity_id].index])
+
+    def emission(self, activity_id):
+        return float(self.emissions[BY_ID[activity_id].index])
+
+    def has_inputs(self):
+        return bool(self.quantities.any())
+
+    def positive_emissions(self):
+        """{activity id: emissions} for activities with emissions above zero."""
+        return {ACTIVITY_IDS[i]: float(self.emissions[i]) for i in np.flatnonzero(self.emissions > 0)}
+
+    # --- Serialization: country, then quantities and factors as float64 ---
+    def to_bytes(self):
+        return (self.country or "").encode("utf-8") + b"\0" + np.concatenate([self.quantities, self.factors]).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        country, _, arrays = data.partition(b"\0")
+        quantities, factors = np.frombuffer(arrays, dtype=np.float64).reshape(2, -1).copy()
+        state = cls(country.decode("utf-8") or None, factors)
+        state.quantities = quantities
+        state._recompute()
+        return state
+
+    def __getstate__(self):
+        return self.to_bytes()
+
+    def __setstate__(self, data):
+        restored = FootprintState.from_bytes(data)
+        for name in self.__slots__:
+            setattr(self, name, getattr(restored, name))
+
+
+# --- Streaming ---
+def read_chunks(path, chunksize=100_000):
+    """Yield DataFrame chunks from a CSV or Parquet file."""
+    if str(path).endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet needs 'pyarrow' (`pip install pyarrow`).") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def score_stream(path, factor_matrix, country_col="Country", id_cols=(), chunksize=100_000):
+    """Score a file chunk by chunk, so large exports never sit fully in memory."""
+    for chunk in read_chunks(path, chunksize=chunksize):
+        yield score_table(chunk, factor_matrix, country_col=country_col, id_cols=id_cols)
+
+
+def score_file(in_path, out_path, factor_matrix, country_col="Country", id_cols=(), chunksize=100_000):
+    """Stream-score ``in_path`` into the CSV ``out_path``; returns the number of rows."""
+    n_rows = 0
+    for i, scored in enumerate(score_stream(in_path, factor_matrix, country_col, id_cols, chunksize)):
+        scored.to_csv(out_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        n_rows += len(scored)
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a table of users x activity quantities.")
+    parser.add_argument("input", help="CSV or Parquet file with one column per activity plus a country column")
+    parser.add_argument("output", help="CSV file to write per-activity, per-category and total emissions to")
+    parser.add_argument("--factors", default=CSV_URL, help="Emission factor CSV (path or URL)")
+    parser.add_argument("--country-col", default="Country")
+    parser.add_argument("--id-col", action="append", default=[], help="Column copied to the output (repeatable)")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    factor_matrix = load_factor_matrix(args.factors)
+    n_rows = score_file(args.input, args.output, factor_matrix, args.country_col, args.id_col, args.chunksize)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {n_rows} rows in {elapsed:.2f}s ({n_rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""GreenPrint AI: retrieval and chat components behind pages/4_Chatbot.py."""
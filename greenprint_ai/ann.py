@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Inverted-file (IVF) approximate nearest-neighbour index for the embedding matrix.
+
+Spherical k-means splits the normalised embeddings into ``n_lists`` cells.
+A query scores only the rows in its ``n_probe`` closest cells, so
+``n_probe`` is the recall/latency knob: ``n_probe == n_lists`` is exact search.
+
+    python -m greenprint_ai.ann build vector_index --lists 64
+    python -m greenprint_ai.ann bench vector_index --k 2 --probes 1 2 4 8
+    python -m greenprint_ai.ann bench --synthetic 50000 --lists 224 --k 10
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+IVF_FNAME = "ivf_index.npz"
+
+
+def normalise(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def default_n_lists(n_rows):
+    return max(1, int(np.sqrt(n_rows)))
+
+
+def spherical_kmeans(matrix, n_lists, n_iter=20, seed=0, batch_size=65536):
+    """Unit-norm centroids and row assignments maximising cosine similarity."""
+    rng = np.random.default_rng(seed)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    n_rows = matrix.shape[0]
+    n_lists = min(n_lists, n_rows)
+    centroids = matrix[rng.choice(n_rows, size=n_lists, replace=False)].copy()
+    assignments = np.zeros(n_rows, dtype=np.int32)
+
+    for _ in range(n_iter):
+        for start in range(0, n_rows, batch_size):
+            block = matrix[start:start + batch_size]
+            assignments[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, matrix)
+        counts = np.bincount(assignments, minlength=n_lists)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = matrix[rng.choice(n_rows, size=int(empty.sum()), replace=False)]
+        centroids = normalise(sums)
+    return centroids, assignments
+
+
+class IVFIndex:
+    """Centroids plus rows grouped by cell (``order[offsets[c]:offsets[c + 1]]``)."""
+
+    def __init__(self, centroids, order, offsets):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, embeddings, n_lists=None, n_iter=20, seed=0):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n_lists = n_lists or default_n_lists(embeddings.shape[0])
+        centroids, assignments = spherical_kmeans(embeddings, n_lists, n_iter=n_iter, seed=seed)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=centroids.shape[0]))])
+        return cls(centroids, order, offsets)
+
+    def candidates(self, query, n_probe):
+        """Row indexes in the ``n_probe`` cells closest to the (normalised) query."""
+        n_probe = max(1, min(n_probe, self.n_lists))
+        cell_scores = self.centroids @ query
+        if n_probe < self.n_lists:
+            cells = np.argpartition(-cell_scores, n_probe - 1)[:n_probe]
+        else:
+            cells = np.arange(self.n_lists)
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+
+    def search(self, matrix, query_embedding, k, n_probe):
+        """(scores, row indexes) of the approximate top-k rows, best first."""
+        query = normalise(query_embedding).astype(matrix.dtype)
+        rows = np.sort(self.candidates(query, n_probe))  # sorted rows read the mmap sequentially
+        k = min(k, rows.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.intp)
+        scores = np.asarray(matrix[rows] @ query)
+        best = np.argpartition(-scores, k - 1)[:k] if k < rows.shape[0] else np.arange(rows.shape[0])
+        best = best[np.argsort(-scores[best])]
+        return scores[best].astype(np.float32), rows[best]
+
+    # --- Persistence ---
+    def save(self, persist_dir):
+        tmp_path = os.path.join(persist_dir, f".{IVF_FNAME}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        os.replace(tmp_path, os.path.join(persist_dir, IVF_FNAME))
+
+    @classmethod
+    def load(cls, persist_dir):
+        """The persisted index, or None if ``persist_dir`` has none."""
+        path = os.path.join(persist_dir, IVF_FNAME)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"])
+
+
+# --- Benchmark ---
+def exact_top_k(matrix, queries, k):
+    scores = queries @ matrix.T
+    k = min(k, matrix.shape[0])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row) for row in best]
+
+
+def benchmark(matrix, index, queries, k, probes):
+    """recall@k against exact search and mean query latency for each ``n_probe``."""
+    matrix = np.asarray(matrix)
+    queries = normalise(queries)
+    truth = exact_top_k(matrix.astype(np.float32), queries, k)
+
+    start = time.perf_counter()
+    for query in queries:
+        np.argpartition(-(matrix @ query), min(k, matrix.shape[0]) - 1)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    results = []
+    for n_probe in probes:
+        hits = 0
+        start = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            _, rows = index.search(matrix, query, k, n_probe)
+            hits += len(expected.intersection(rows.tolist()))
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        results.append({"n_probe": n_probe, "recall": hits / (len(expected) * len(queries)), "latency_ms": latency_ms})
+    return exact_ms, results
+
+
+def _synthetic(n_rows, dim, seed=0):
+    # Clustered data: uniform random vectors make every index look bad
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, n_rows // 200), dim))
+    return normalise(centres[rng.integers(0, centres.shape[0], n_rows)] + 0.3 * rng.normal(size=(n_rows, dim)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or benchmark the IVF index.")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("persist_dir", nargs="?", default="vector_index")
+    parser.add_argument("--lists", type=int, default=None, help="Number of k-means cells (default: sqrt(n))")
+    parser.add_argument("--iters", type=int, default=20)
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on N synthetic 384-dim vectors instead")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        matrix = _synthetic(args.synthetic, 384)
+    else:
+        from greenprint_ai.vector_store import EMBEDDINGS_FNAME
+        matrix = np.load(os.path.join(args.persist_dir, EMBEDDINGS_FNAME), mmap_mode="r")
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = IVFIndex.build(matrix, n_lists=args.lists, n_iter=args.iters)
+        index.save(args.persist_dir)
+        print(f"Built {index.n_lists} lists over {matrix.shape[0]} rows in {time.perf_counter() - start:.2f}s.")
+        return
+
+    index = IVFIndex.build(matrix, n_lists=args.lists, n_iter=args.iters) if args.synthetic else IVFIndex.load(args.persist_dir)
+    if index is None:
+        index = IVFIndex.build(matrix, n_lists=args.lists, n_iter=args.iters)
+    rng = np.random.default_rng(1)
+    # Held-in rows plus noise stand in for real questions
+    queries = np.asarray(matrix[rng.integers(0, matrix.shape[0], args.queries)], dtype=np.float32)
+    queries = queries + 0.5 * rng.normal(size=queries.shape).astype(np.float32) / np.sqrt(queries.shape[1])
+    exact_ms, results = benchmark(matrix, index, queries, args.k, args.probes)
+    print(f"rows={matrix.shape[0]} lists={index.n_lists} k={args.k} exact={exact_ms:.3f} ms/query")
+    for r in results:
+        print(f"n_probe={r['n_probe']:>4}  recall@{args.k}={r['recall']:.3f}  {r['latency_ms']:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Two-level chatbot cache shared by all sessions.
+
+Level 1 maps a normalised prompt to its query embedding, so repeated
+questions skip the MiniLM forward pass. Level 2 maps (retrieved node ids,
+chat history, prompt) to the final answer, so repeated questions skip the
+remote LLM call; it also answers near-duplicate prompts whose embedding is
+within a cosine threshold of a cached one with the same nodes and history.
+The history is part of the key because the chat engine answers from it too:
+a "why?" after one conversation is a different question after another.
+
+Both levels are bounded LRU caches with a TTL and hit/miss counters.
+``PrefetchedRetriever`` lets the chat engine reuse the nodes retrieved for
+the level 2 key instead of searching the index a second time.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import QueryBundle
+
+
+def normalise_prompt(prompt):
+    return " ".join(prompt.lower().split()).rstrip(" ?!.")
+
+
+def history_key(messages):
+    """Fingerprint of the chat history sent with a prompt; "" for a first turn."""
+    if not messages:
+        return ""
+    digest = hashlib.sha256()
+    for message in messages:
+        role = getattr(message.role, "value", message.role)
+        digest.update(f"{role}\0{message.content or ''}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TTLLRUCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after insertion."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                    self.evictions += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self):
+        """Live (key, value) pairs, oldest first; does not touch LRU order or counters."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (stamp, value) in self._data.items() if now - stamp <= self.ttl]
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class AnswerCache:
+    """Level 2: (retrieved node ids, history, normalised prompt) -> answer, with near-duplicate matching."""
+
+    def __init__(self, maxsize=512, ttl=6 * 3600, similarity_threshold=0.95):
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._cache = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _unit(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return embedding / (np.linalg.norm(embedding) or 1.0)
+
+    def lookup(self, node_ids, prompt, embedding, history=()):
+        """Cached answer for this prompt, context and chat history (``ChatMessage`` list), or None."""
+        key = (tuple(node_ids), history_key(history), normalise_prompt(prompt))
+        cached = self._cache.get(key)
+        if cached is None:
+            # Near duplicates: same retrieved context and history, prompt embedding above the threshold
+            query = self._unit(embedding)
+            best_key, best_score = None, self.similarity_threshold
+            for candidate_key, (_, candidate_embedding) in self._cache.items():
+                if candidate_key[:2] == key[:2]:
+                    score = float(candidate_embedding @ query)
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+            cached = self._cache.get(best_key) if best_key is not None else None
+            if cached is None:
+                self.misses += 1
+                return None
+            self.near_hits += 1
+        self.hits += 1
+        return cached[0]
+
+    def store(self, node_ids, prompt, embedding, answer, history=()):
+        key = (tuple(node_ids), history_key(history), normalise_prompt(prompt))
+        self._cache.put(key, (answer, self._unit(embedding)))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = self._cache.stats()
+        stats.update(hits=self.hits, near_hits=self.near_hits, misses=self.misses,
+                     hit_rate=self.hits / lookups if lookups else 0.0)
+        return stats
+
+
+class CachedQueryEmbedding(BaseEmbedding):
+    """Level 1: wraps an embedding model and memoises query embeddings by normalised prompt."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: TTLLRUCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, maxsize: int = 4096, ttl: float = 24 * 3600, **kwargs: Any) -> None:
+        super().__init__(model_name=inner.model_name, embed_batch_size=inner.embed_batch_size, **kwargs)
+        self._inner = inner
+        self._cache = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedQueryEmbedding"
+
+    def stats(self):
+        return self._cache.stats()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        key = normalise_prompt(query)
+        embedding = self._cache.get(key)
+        if embedding is None:
+            embedding = self._inner.get_query_embedding(query)
+            self._cache.put(key, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._inner.get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._inner.get_text_embedding_batch(texts)
+
+
+class PrefetchedRetriever(BaseRetriever):
+    """Wraps a retriever so the chat engine reuses nodes already retrieved for the same prompt.
+
+    ``retrieve_for`` searches once and remembers the result for the calling
+    thread (each Streamlit session runs its script on its own thread); the
+    engine's next ``retrieve`` of that prompt takes it instead of searching again.
+    """
+
+    def __init__(self, inner: BaseRetriever, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._inner = inner
+        self._local = threading.local()
+
+    def retrieve_for(self, prompt, embedding):
+        nodes = self._inner.retrieve(QueryBundle(prompt, embedding=embedding))
+        self._local.prefetched = (prompt, nodes)
+        return nodes
+
+    def _retrieve(self, query_bundle: QueryBundle):
+        prefetched, self._local.prefetched = getattr(self._local, "prefetched", None), None
+        if prefetched is not None and prefetched[0] == query_bundle.query_str:
+            return prefetched[1]
+        return self._inner.retrieve(query_bundle)
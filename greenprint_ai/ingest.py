@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Incremental ingestion into ``vector_index/``.
+
+Source documents are streamed file by file, compared with the ``doc_hash``
+recorded in the docstore (``docstore/metadata``) and only new or changed
+documents are chunked, embedded in batches and written to the store;
+changed documents first have their old nodes removed.
+
+    python -m greenprint_ai.ingest docs/ --persist-dir vector_index
+    python -m greenprint_ai.ingest docs/ --dry-run
+    python -m greenprint_ai.ingest docs/ --prune   # also drop documents no longer in docs/
+
+Document ids are ``src:<path relative to source_dir>``, plus ``#page=<label>``
+for paged formats such as PDF, so re-running on the same directory recognises
+unchanged files however ``source_dir`` is spelled. ``--prune`` only removes
+documents with such ids. An index written before this scheme (random UUIDs)
+is re-keyed once from each document's ``file_name`` and ``page_label``.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from greenprint_ai.resources import EMBEDDING_MODEL, PERSIST_DIR
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Document ids ---
+DOC_ID_PREFIX = "src:"
+
+
+def document_id(relative_path, page_label=None, part=None):
+    """Stable id of one document (a file, or one page / part of it)."""
+    doc_id = DOC_ID_PREFIX + relative_path.replace(os.sep, "/")
+    if page_label is not None:
+        return f"{doc_id}#page={page_label}"
+    return doc_id if part is None else f"{doc_id}#part={part}"
+
+
+def content_hash(document):
+    """Change-detection hash from the id and text only (not paths or file dates)."""
+    return hashlib.sha256(f"{document.doc_id}\0{document.text}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def iter_documents(source_dir, extensions=None):
+    """Yield documents one source file at a time, with ids relative to ``source_dir``."""
+    from llama_index.core import SimpleDirectoryReader
+
+    root = os.path.abspath(source_dir)
+    reader = SimpleDirectoryReader(source_dir, recursive=True, required_exts=extensions)
+    for documents in reader.iter_data():
+        for part, document in enumerate(documents):
+            relative_path = os.path.relpath(os.path.abspath(document.metadata["file_path"]), root)
+            document.id_ = document_id(relative_path, document.metadata.get("page_label"),
+                                       part if len(documents) > 1 else None)
+            yield document
+
+
+def migrate_legacy_ids(persist_dir, dry_run=False, log=print):
+    """Re-key documents stored under pre-``DOC_ID_PREFIX`` ids; returns {old id: new id}.
+
+    The new id treats each document's ``file_name`` as its path relative to the
+    source directory, with its ``page_label``. Documents without a file name, or
+    whose new id would collide, keep their old id (and are never pruned).
+    """
+    docstore_path = os.path.join(persist_dir, "docstore.json")
+    if not os.path.exists(docstore_path):
+        return {}
+    with open(docstore_path, encoding="utf-8") as f:
+        docstore = json.load(f)
+    ref_doc_info = docstore.get("docstore/ref_doc_info", {})
+
+    candidates = {}
+    for old_id, info in ref_doc_info.items():
+        metadata = info.get("metadata") or {}
+        if not old_id.startswith(DOC_ID_PREFIX) and metadata.get("file_name"):
+            candidates[old_id] = document_id(metadata["file_name"], metadata.get("page_label"))
+    targets = list(candidates.values()) + [ref_id for ref_id in ref_doc_info if ref_id.startswith(DOC_ID_PREFIX)]
+    mapping = {old_id: new_id for old_id, new_id in candidates.items() if targets.count(new_id) == 1}
+    for old_id in candidates.keys() - mapping.keys():
+        log(f"keep legacy id (ambiguous file name): {old_id}")
+    if not mapping or dry_run:
+        return mapping
+
+    docstore["docstore/ref_doc_info"] = {mapping.get(ref_id, ref_id): info for ref_id, info in ref_doc_info.items()}
+    metadata = {}
+    for key, entry in docstore.get("docstore/metadata", {}).items():
+        if entry.get("ref_doc_id") in mapping:
+            entry = dict(entry, ref_doc_id=mapping[entry["ref_doc_id"]])
+        metadata[mapping.get(key, key)] = entry
+    docstore["docstore/metadata"] = metadata
+    for node in docstore.get("docstore/data", {}).values():
+        source = node.get("__data__", {}).get("relationships", {}).get("1")  # NodeRelationship.SOURCE
+        if source and source.get("node_id") in mapping:
+            source["node_id"] = mapping[source["node_id"]]
+    _write_json(docstore_path, docstore)
+
+    # The vector store keeps each row's ref doc id too (used to delete a document's rows)
+    from greenprint_ai.vector_store import IDS_FNAME
+
+    ids_path = os.path.join(persist_dir, IDS_FNAME)
+    if os.path.exists(ids_path):
+        with open(ids_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["ref_doc_ids"] = [mapping.get(ref_id, ref_id) for ref_id in meta["ref_doc_ids"]]
+        _write_json(ids_path, meta)
+    log(f"migrated {len(mapping)} document ids to '{DOC_ID_PREFIX}<path>' ids")
+    return mapping
+
+
+def _write_json(path, data):
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def embed_nodes(nodes, embed_model):
+    from llama_index.core.schema import MetadataMode
+
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    for node, embedding in zip(nodes, embed_model.get_text_embedding_batch(texts)):
+        node.embedding = embedding
+    return nodes
+
+
+def ingest(source_dir, embed_model, persist_dir=PERSIST_DIR, chunk_size=512, chunk_overlap=50,
+           doc_batch_size=32, prune=False, dry_run=False, extensions=None, log=print):
+    """Bring ``persist_dir`` in line with ``source_dir``; returns a summary dict."""
+    from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
+    from llama_index.core.node_parser import SentenceSplitter
+    from greenprint_ai.ann import IVF_FNAME
+    from greenprint_ai.vector_store import EMBEDDINGS_FNAME, MmapVectorStore
+
+    start = time.perf_counter()
+    migrated = migrate_legacy_ids(persist_dir, dry_run=dry_run, log=log)
+    legacy_ids = {new_id: old_id for old_id, new_id in migrated.items()} if dry_run else {}
+    if os.path.exists(os.path.join(persist_dir, EMBEDDINGS_FNAME)):
+        vector_store = MmapVectorStore.from_persist_dir(persist_dir, mmap=False)
+        storage_context = StorageContext.from_defaults(persist_dir=persist_dir, vector_store=vector_store)
+        index = load_index_from_storage(storage_context, embed_model=embed_model)
+    else:
+        vector_store = MmapVectorStore()
+        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        index = VectorStoreIndex([], storage_context=storage_context, embed_model=embed_model)
+    had_ann = os.path.exists(os.path.join(persist_dir, IVF_FNAME))
+    docstore = index.docstore
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    summary = {"migrated": len(migrated), "unchanged": 0, "added": 0, "updated": 0, "removed": 0, "nodes_written": 0}
+    seen = set()
+
+    def pending_documents():
+        for document in iter_documents(source_dir, extensions):
+            doc_id = document.doc_id
+            seen.add(doc_id)
+            existing = docstore.get_document_hash(legacy_ids.get(doc_id, doc_id))
+            if existing == content_hash(document):
+                summary["unchanged"] += 1
+                continue
+            summary["updated" if existing is not None else "added"] += 1
+            log(f"{'update' if existing is not None else 'add'}: {doc_id}")
+            yield document, existing is not None
+
+    for batch in _batched(pending_documents(), doc_batch_size):
+        if dry_run:
+            continue
+        for document, changed in batch:
+            if changed:
+                index.delete_ref_doc(document.doc_id, delete_from_docstore=True)
+        nodes = embed_nodes(splitter.get_nodes_from_documents([document for document, _ in batch]), embed_model)
+        index.insert_nodes(nodes)
+        for document, _ in batch:
+            docstore.set_document_hash(document.doc_id, content_hash(document))
+        summary["nodes_written"] += len(nodes)
+
+    if prune:
+        # Only ids written by this module: anything else was not created from a source directory
+        for ref_doc_id in list(docstore.get_all_ref_doc_info() or {}):
+            if ref_doc_id.startswith(DOC_ID_PREFIX) and ref_doc_id not in seen:
+                summary["removed"] += 1
+                log(f"remove: {ref_doc_id}")
+                if not dry_run:
+                    index.delete_ref_doc(ref_doc_id, delete_from_docstore=True)
+
+    changed = summary["migrated"] + summary["added"] + summary["updated"] + summary["removed"]
+    if changed and not dry_run:
+        if had_ann:
+            vector_store.build_ann()
+        storage_context.persist(persist_dir=persist_dir)
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally (re)build the GreenPrint AI vector index.")
+    parser.add_argument("source_dir", help="Directory of source documents (searched recursively)")
+    parser.add_argument("--persist-dir", default=PERSIST_DIR)
+    parser.add_argument("--ext", action="append", default=None, help="Only ingest these extensions, e.g. --ext .md (repeatable)")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--doc-batch-size", type=int, default=32, help="Documents chunked and embedded per batch")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Chunks per embedding forward pass")
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="CPU threads for the embedding model")
+    parser.add_argument("--prune", action="store_true", help="Remove documents that are no longer in source_dir")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args(argv)
+
+    import torch
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    torch.set_num_threads(args.threads)
+    embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL, embed_batch_size=args.embed_batch_size, device="cpu")
+    summary = ingest(
+        args.source_dir, embed_model, persist_dir=args.persist_dir, chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap, doc_batch_size=args.doc_batch_size, prune=args.prune,
+        dry_run=args.dry_run, extensions=args.ext,
+    )
+    print(", ".join(f"{key}={value}" for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    main()
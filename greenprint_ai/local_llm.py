@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Offline, CPU-only LLM backend for GreenPrint AI.
+
+A small instruct model is loaded with transformers and int8 dynamic
+quantisation of its Linear layers. Prompts from concurrent sessions go
+through ``BatchScheduler``: a single worker thread collects up to
+``max_batch`` queued prompts (waiting at most ``batch_window`` seconds for
+company) and runs them as one padded ``generate`` call. The queue depth is
+capped so overload fails fast instead of piling up latency, and a prompt whose
+caller has timed out is dropped from the queue instead of taking a batch slot.
+
+Select it with ``GREENPRINT_LLM_BACKEND=local`` (see ``greenprint_ai.resources``).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Sequence
+
+from llama_index.core.base.llms.types import ChatMessage, CompletionResponse, CompletionResponseGen, LLMMetadata
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.llms.custom import CustomLLM
+
+from greenprint_ai.streaming import LatencyTracker
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the local model already has ``max_queue`` prompts waiting."""
+
+
+class BatchScheduler:
+    """Collects concurrent prompts into batches for ``generate_batch(prompts, max_new_tokens)``."""
+
+    def __init__(self, generate_batch, max_batch=8, batch_window=0.05, max_queue=64):
+        self.generate_batch = generate_batch
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._latency = LatencyTracker()
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.busy_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name="local-llm-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt, max_new_tokens=256):
+        """Future resolving to the completion text for ``prompt``."""
+        future = Future()
+        try:
+            self._queue.put_nowait((prompt, max_new_tokens, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError("The local model is busy; please try again in a moment.") from None
+        return future
+
+    def complete(self, prompt, max_new_tokens=256, timeout=None):
+        """Completion text for ``prompt``; on timeout the queued request is cancelled and TimeoutError raised."""
+        future = self.submit(prompt, max_new_tokens)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()  # no-op if its batch is already generating
+            raise
+
+    def _take(self, item):
+        # Marks the request as running; False for one cancelled by its caller, which is dropped
+        if item[2].set_running_or_notify_cancel():
+            return True
+        with self._lock:
+            self.cancelled += 1
+        return False
+
+    def _next_batch(self):
+        first = self._queue.get()
+        while not self._take(first):
+            first = self._queue.get()
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if self._take(item):
+                batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            prompts = [item[0] for item in batch]
+            max_new_tokens = max(item[1] for item in batch)
+            start = time.perf_counter()
+            try:
+                outputs = self.generate_batch(prompts, max_new_tokens)
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.busy_seconds += finished - start
+            for (_, _, future, submitted), output in zip(batch, outputs):
+                self._latency.record(finished - submitted)
+                future.set_result(output)
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            stats = {
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "queue_depth": self._queue.qsize(),
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+                "throughput_rps": round(self.requests / elapsed, 3) if elapsed > 0 else 0.0,
+                "utilisation": round(self.busy_seconds / elapsed, 3) if elapsed > 0 else 0.0,
+            }
+        stats["latency"] = self._latency.stats()
+        return stats
+
+
+class TransformersBatchGenerator:
+    """Greedy batched generation with a (dynamically int8-quantised) causal LM on CPU."""
+
+    def __init__(self, model_name, quantize=True, num_threads=None):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.tokenizer.padding_side = "left"  # decoder-only models generate from the right edge
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+
+    def messages_to_prompt(self, messages: Sequence[ChatMessage]) -> str:
+        chat = [{"role": m.role.value, "content": m.content or ""} for m in messages]
+        return self.tokenizer.apply_chat_template(chat, tokenize=False, add_generation_prompt=True)
+
+    def __call__(self, prompts, max_new_tokens):
+        inputs = self.tokenizer(list(prompts), return_tensors="pt", padding=True)
+        with self._torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+        new_tokens = output_ids[:, inputs["input_ids"].shape[1]:]
+        return [text.strip() for text in self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)]
+
+
+class LocalBatchedLLM(CustomLLM):
+    """llama_index LLM that sends completions through a ``BatchScheduler``.
+
+    Streaming yields the whole answer as one chunk: batched generation
+    finishes all prompts of a batch together.
+    """
+
+    model_name: str = "local"
+    context_window: int = 4096
+    max_new_tokens: int = 256
+    request_timeout: float = 120.0
+
+    _scheduler: BatchScheduler = PrivateAttr()
+
+    def __init__(self, scheduler: BatchScheduler, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._scheduler = scheduler
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalBatchedLLM"
+
+    @property
+    def scheduler(self) -> BatchScheduler:
+        return self._scheduler
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(context_window=self.context_window, num_output=self.max_new_tokens, model_name=self.model_name)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text = self._scheduler.complete(prompt, self.max_new_tokens, timeout=self.request_timeout)
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        text = self._scheduler.complete(prompt, self.max_new_tokens, timeout=self.request_timeout)
+        yield CompletionResponse(text=text, delta=text)
+
+
+def load_local_llm(model_name, max_batch=8, batch_window=0.05, max_queue=64, max_new_tokens=256):
+    generator = TransformersBatchGenerator(model_name)
+    scheduler = BatchScheduler(generator, max_batch=max_batch, batch_window=batch_window, max_queue=max_queue)
+    return LocalBatchedLLM(
+        scheduler,
+        model_name=model_name,
+        max_new_tokens=max_new_tokens,
+        messages_to_prompt=generator.messages_to_prompt,
+    )
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Heavy, shareable chatbot resources: the embedding model and the vector index."""
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# LLM Configuration: "hosted" (HF Inference API) or "local" (CPU model behind a batch scheduler)
+LLM_BACKEND = os.environ.get("GREENPRINT_LLM_BACKEND", "hosted")
+HF_MODEL = "mistralai/Mistral-7B-Instruct-v0.3"
+LOCAL_MODEL = os.environ.get("GREENPRINT_LOCAL_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+
+# Stream answers token by token (set GREENPRINT_STREAM=0 for blocking responses)
+STREAM_RESPONSES = os.environ.get("GREENPRINT_STREAM", "1") != "0"
+
+# Embeddings Configuration
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-l6-v2"
+
+# Vector Database Configuration
+PERSIST_DIR = os.path.join(ROOT_DIR, "vector_index")
+
+# IVF cells probed per query when vector_index/ivf_index.npz exists (0 = exact search).
+# Pick it from `python -m greenprint_ai.ann bench vector_index`.
+ANN_N_PROBE = int(os.environ.get("GREENPRINT_ANN_NPROBE", "8"))
+
+
+def load_llm(backend=None):
+    backend = backend or LLM_BACKEND
+    if backend == "local":
+        from greenprint_ai.local_llm import load_local_llm
+
+        return load_local_llm(LOCAL_MODEL)
+    if backend != "hosted":
+        raise ValueError(f"Unknown LLM backend '{backend}' (expected 'hosted' or 'local').")
+    from llama_index.llms.huggingface import HuggingFaceInferenceAPI
+
+    return HuggingFaceInferenceAPI(model_name=HF_MODEL)
+
+
+def load_embeddings(model_name=EMBEDDING_MODEL):
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    return HuggingFaceEmbedding(model_name=model_name)
+
+
+def load_vector_index(embeddings, persist_dir=PERSIST_DIR):
+    from llama_index.core import StorageContext, load_index_from_storage
+    from greenprint_ai.vector_store import MmapVectorStore
+
+    if not os.path.exists(persist_dir):
+        raise FileNotFoundError(f"Vector index directory '{persist_dir}' not found. Make sure it's in your GitHub repository root.")
+    vector_store = MmapVectorStore.from_persist_dir(persist_dir, n_probe=ANN_N_PROBE)
+    storage_context = StorageContext.from_defaults(persist_dir=persist_dir, vector_store=vector_store)
+    return load_index_from_storage(storage_context, embed_model=embeddings)
+
+
+def load_chatbot_index():
+    """Embedding model plus the vector index built on it: (embeddings, vector_index)."""
+    embeddings = load_embeddings()
+    return embeddings, load_vector_index(embeddings)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Per-session chat engines over shared models.
+
+The LLM, embedder, index and retriever are process-wide; each browser session
+gets its own lightweight ``ContextChatEngine`` and ``ChatMemoryBuffer``, so
+histories never mix. Memory is bounded twice: ``token_limit`` caps what is
+sent with each prompt, and ``trim`` drops the oldest stored turns beyond
+``max_messages``. Sessions idle for ``idle_ttl`` seconds (or the least
+recently used beyond ``max_sessions``) are evicted.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from llama_index.core.base.llms.types import MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
+
+
+class ChatSession:
+    def __init__(self, session_id, engine, memory):
+        self.session_id = session_id
+        self.engine = engine
+        self.memory = memory
+        self.last_used = time.monotonic()
+
+
+class SessionEnginePool:
+    """session id -> ChatSession, built on demand by ``engine_factory(memory)``."""
+
+    def __init__(self, engine_factory, token_limit=1500, max_messages=20, idle_ttl=1800, max_sessions=1000):
+        self.engine_factory = engine_factory
+        self.token_limit = token_limit
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    def get(self, session_id):
+        """The session's engine bundle, creating it if needed (and evicting idle ones)."""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                memory = ChatMemoryBuffer.from_defaults(token_limit=self.token_limit)
+                session = ChatSession(session_id, self.engine_factory(memory), memory)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            return session
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def trim(self, session):
+        """Drop the oldest stored turns beyond ``max_messages``, starting the history on a user turn."""
+        messages = session.memory.get_all()
+        if len(messages) <= self.max_messages:
+            return
+        kept = messages[-self.max_messages:]
+        while kept and kept[0].role != MessageRole.USER:
+            kept = kept[1:]
+        session.memory.set(kept)
+
+    def stats(self):
+        return {"sessions": len(self._sessions), "max_sessions": self.max_sessions, "evictions": self.evictions}
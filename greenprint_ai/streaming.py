@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Token streaming helpers and time-to-first-token tracking for GreenPrint AI."""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Rolling window of latency samples (seconds) with percentile summaries."""
+
+    def __init__(self, window=1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def stats(self):
+        with self._lock:
+            samples = np.array(self._samples)
+        if not samples.size:
+            return {"count": self.count}
+        p50, p95 = np.percentile(samples, [50, 95])
+        return {"count": self.count, "p50_s": round(float(p50), 3), "p95_s": round(float(p95), 3), "max_s": round(float(samples.max()), 3)}
+
+
+class TimedTokens:
+    """Iterates a token generator, recording the time from ``start`` to the first token."""
+
+    def __init__(self, tokens, start, tracker=None):
+        self._tokens = tokens
+        self._start = start
+        self._tracker = tracker
+        self.time_to_first_token = None
+
+    def __iter__(self):
+        for token in self._tokens:
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - self._start
+                if self._tracker is not None:
+                    self._tracker.record(self.time_to_first_token)
+            yield token
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Array-backed vector store for the GreenPrint AI index.
+
+Embeddings live in one contiguous, L2-normalised ``embeddings.npy`` (float32
+or float16) that is memory-mapped on load; node ids and ref-doc ids live in
+``embedding_ids.json`` next to it. Top-k is one matrix-vector product plus
+``argpartition`` instead of a Python cosine loop over JSON float lists.
+If an IVF index (see ``greenprint_ai.ann``) was built next to it and
+``n_probe`` is set, queries only score the rows in the closest cells.
+
+Convert an existing ``default__vector_store.json`` with:
+
+    python -m greenprint_ai.vector_store vector_index
+"""
+import json
+import os
+import sys
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+
+from greenprint_ai.ann import IVF_FNAME, IVFIndex, normalise
+
+EMBEDDINGS_FNAME = "embeddings.npy"
+IDS_FNAME = "embedding_ids.json"
+SIMPLE_STORE_FNAME = "default__vector_store.json"
+
+
+def top_k(matrix, query_embedding, k):
+    """(scores, row indexes) of the k rows of ``matrix`` most similar to the query, best first."""
+    n_rows = matrix.shape[0]
+    k = min(k, n_rows)
+    if k <= 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.intp)
+    scores = matrix @ normalise(query_embedding).astype(matrix.dtype)
+    best = np.argpartition(-scores, k - 1)[:k] if k < n_rows else np.arange(n_rows)
+    best = best[np.argsort(-scores[best])]
+    return scores[best].astype(np.float32), best
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """Vector store backed by a memory-mapped ``.npy`` matrix of normalised embeddings.
+
+    Like ``SimpleVectorStore`` it only stores embeddings; node text stays in
+    the docstore.
+    """
+
+    stores_text: bool = False
+
+    _embeddings: np.ndarray = PrivateAttr()
+    _ids: List[str] = PrivateAttr()
+    _ref_doc_ids: List[str] = PrivateAttr()
+    _dtype: Any = PrivateAttr()
+    _ann: Optional[IVFIndex] = PrivateAttr(default=None)
+    _n_probe: int = PrivateAttr(default=0)
+
+    def __init__(self, embeddings=None, ids=None, ref_doc_ids=None, dtype=np.float32, ann=None, n_probe=0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._ids = list(ids or [])
+        self._ref_doc_ids = list(ref_doc_ids or ["None"] * len(self._ids))
+        self._dtype = np.dtype(dtype)
+        if embeddings is None:
+            embeddings = np.empty((0, 0), dtype=self._dtype)
+        self._embeddings = embeddings
+        self._ann = ann
+        self._n_probe = n_probe
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def node_ids(self) -> List[str]:
+        return list(self._ids)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._embeddings
+
+    @property
+    def ann(self) -> Optional[IVFIndex]:
+        return self._ann
+
+    def build_ann(self, n_lists: Optional[int] = None, n_probe: Optional[int] = None) -> IVFIndex:
+        """(Re)build the IVF index over the current rows; saved by the next ``persist``."""
+        self._ann = IVFIndex.build(self._embeddings, n_lists=n_lists)
+        if n_probe is not None:
+            self._n_probe = n_probe
+        return self._ann
+
+    # --- Loading / saving ---
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, mmap: bool = True, n_probe: int = 0) -> "MmapVectorStore":
+        """Open ``embeddings.npy`` memory-mapped (converting the JSON store on first use).
+
+        With ``n_probe > 0`` a persisted IVF index is used for queries; 0 means exact search.
+        """
+        npy_path = os.path.join(persist_dir, EMBEDDINGS_FNAME)
+        if not os.path.exists(npy_path):
+            json_path = os.path.join(persist_dir, SIMPLE_STORE_FNAME)
+            if not os.path.exists(json_path):
+                raise FileNotFoundError(f"No '{EMBEDDINGS_FNAME}' or '{SIMPLE_STORE_FNAME}' in '{persist_dir}'.")
+            cls.from_simple_store_json(json_path).persist(os.path.join(persist_dir, SIMPLE_STORE_FNAME))
+        embeddings = np.load(npy_path, mmap_mode="r" if mmap else None)
+        with open(os.path.join(persist_dir, IDS_FNAME), encoding="utf-8") as f:
+            meta = json.load(f)
+        ann = IVFIndex.load(persist_dir) if n_probe > 0 else None
+        return cls(embeddings=embeddings, ids=meta["ids"], ref_doc_ids=meta["ref_doc_ids"], dtype=embeddings.dtype,
+                   ann=ann, n_probe=n_probe)
+
+    @classmethod
+    def from_simple_store_json(cls, json_path: str, dtype=np.float32) -> "MmapVectorStore":
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        ids = list(data["embedding_dict"])
+        ref_doc_ids = [data.get("text_id_to_ref_doc_id", {}).get(node_id, "None") for node_id in ids]
+        embeddings = normalise([data["embedding_dict"][node_id] for node_id in ids]).astype(dtype)
+        return cls(embeddings=embeddings, ids=ids, ref_doc_ids=ref_doc_ids, dtype=dtype)
+
+    def persist(self, persist_path: str, fs: Optional[Any] = None) -> None:
+        """Write ``embeddings.npy`` and ``embedding_ids.json`` into the directory of ``persist_path``.
+
+        ``StorageContext.persist`` passes the JSON store path; only its
+        directory is used. An ``ivf_index.npz`` already in the directory
+        refers to the rows of the matrix being overwritten, so it is always
+        replaced: by this store's index, by one rebuilt over the new matrix
+        with the same number of lists when ANN search is on (``n_probe > 0``),
+        or else removed rather than paying for k-means nobody will query.
+        """
+        persist_dir = os.path.dirname(persist_path) or "."
+        os.makedirs(persist_dir, exist_ok=True)
+        matrix = np.ascontiguousarray(self._embeddings, dtype=self._dtype)
+        # Write next to the target and rename: the old file may still be memory-mapped
+        tmp_npy = os.path.join(persist_dir, f".{EMBEDDINGS_FNAME}.tmp")
+        with open(tmp_npy, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_npy, os.path.join(persist_dir, EMBEDDINGS_FNAME))
+        tmp_ids = os.path.join(persist_dir, f".{IDS_FNAME}.tmp")
+        with open(tmp_ids, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "ref_doc_ids": self._ref_doc_ids}, f)
+        os.replace(tmp_ids, os.path.join(persist_dir, IDS_FNAME))
+        if self._ann is not None:  # built over (or loaded with) exactly these rows
+            self._ann.save(persist_dir)
+        elif os.path.exists(os.path.join(persist_dir, IVF_FNAME)):
+            if self._ids and self._n_probe > 0:
+                self.build_ann(n_lists=IVFIndex.load(persist_dir).n_lists).save(persist_dir)
+            else:
+                os.remove(os.path.join(persist_dir, IVF_FNAME))
+
+    # --- Mutation (copies the matrix; intended for ingestion, not the query path) ---
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        new = normalise([node.get_embedding() for node in nodes]).astype(self._dtype)
+        if self._embeddings.size:
+            self._embeddings = np.concatenate([np.asarray(self._embeddings), new])
+        else:
+            self._embeddings = new
+        self._ids.extend(node.node_id for node in nodes)
+        self._ref_doc_ids.extend(node.ref_doc_id or "None" for node in nodes)
+        self._drop_ann()
+        return [node.node_id for node in nodes]
+
+    def _drop_ann(self):
+        self._ann = None  # row numbers changed; persist() rebuilds a saved index
+
+    def _keep_rows(self, keep):
+        self._drop_ann()
+        self._embeddings = np.asarray(self._embeddings)[keep]
+        self._ids = [node_id for node_id, k in zip(self._ids, keep) if k]
+        self._ref_doc_ids = [ref for ref, k in zip(self._ref_doc_ids, keep) if k]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._keep_rows(np.array([ref != ref_doc_id for ref in self._ref_doc_ids], dtype=bool))
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters: Optional[Any] = None, **delete_kwargs: Any) -> None:
+        if filters is not None:
+            raise NotImplementedError("MmapVectorStore does not support metadata filters.")
+        drop = set(node_ids or [])
+        self._keep_rows(np.array([node_id not in drop for node_id in self._ids], dtype=bool))
+
+    def clear(self) -> None:
+        self._drop_ann()
+        self._embeddings = np.empty((0, 0), dtype=self._dtype)
+        self._ids = []
+        self._ref_doc_ids = []
+
+    # --- Query ---
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("MmapVectorStore does not support metadata filters.")
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"Invalid query mode: {query.mode}")
+        if query.query_embedding is None or not self._ids:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        matrix = self._embeddings
+        row_ids = self._ids
+        if query.node_ids is not None:
+            wanted = set(query.node_ids)
+            rows = np.array([i for i, node_id in enumerate(self._ids) if node_id in wanted], dtype=np.intp)
+            matrix = matrix[rows]
+            row_ids = [self._ids[i] for i in rows]
+        elif self._ann is not None and self._n_probe > 0:
+            scores, best = self._ann.search(matrix, query.query_embedding, query.similarity_top_k, self._n_probe)
+            return VectorStoreQueryResult(similarities=scores.tolist(), ids=[row_ids[i] for i in best])
+
+        scores, best = top_k(matrix, query.query_embedding, query.similarity_top_k)
+        return VectorStoreQueryResult(similarities=scores.tolist(), ids=[row_ids[i] for i in best])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    persist_dir = argv[0] if argv else "vector_index"
+    json_path = os.path.join(persist_dir, SIMPLE_STORE_FNAME)
+    store = MmapVectorStore.from_simple_store_json(json_path)
+    previous = IVFIndex.load(persist_dir)
+    if previous is not None and store.node_ids:  # keep an existing IVF index, rebuilt for the new rows
+        store.build_ann(n_lists=previous.n_lists)
+    store.persist(json_path)
+    print(f"Wrote {len(store.node_ids)} embeddings of dim {store.embeddings.shape[1]} to '{persist_dir}'.")
+
+
+if __name__ == "__main__":
+    main()
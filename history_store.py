@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""Append-only history of consenting users' calculations (SQLite, WAL mode).
+
+Pages call ``HistoryStore.record(...)``, which only enqueues the row; a
+background thread writes queued rows in batches, one transaction each, so a
+calculation never waits on disk. Each row is compact: an anonymous user key
+(the email hashed with a secret per-install salt), month, country, age, gender and the per-category
+and total kg CO2. The same transaction also updates ``monthly_totals``
+(count and sums per month x country), so cohort means read a few summary rows
+instead of scanning the raw history.
+
+    python history_store.py cohorts --country Germany
+    python history_store.py trend <user_key>
+"""
+import argparse
+import hashlib
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from taxonomy import CATEGORY_KEYS
+
+HISTORY_DB = os.environ.get(
+    "GREENPRINT_HISTORY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".history", "footprints.sqlite3")
+)
+# Secret salt for user keys; without it a random salt is generated once and kept beside the database
+HISTORY_SALT = os.environ.get("GREENPRINT_HISTORY_SALT")
+
+_CATEGORY_COLUMNS = ", ".join(f"{category} REAL NOT NULL" for category in CATEGORY_KEYS)
+_CATEGORY_SUMS = ", ".join(f"sum_{category} REAL NOT NULL" for category in CATEGORY_KEYS)
+_ROW_COLUMNS = ("user_key", "recorded_at", "month", "country", "age", "gender") + CATEGORY_KEYS + ("total",)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS footprints (
+    id INTEGER PRIMARY KEY,
+    user_key TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    month INTEGER NOT NULL,
+    country TEXT NOT NULL,
+    age INTEGER,
+    gender TEXT,
+    {_CATEGORY_COLUMNS},
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS footprints_user ON footprints (user_key, recorded_at);
+CREATE INDEX IF NOT EXISTS footprints_month_country ON footprints (month, country);
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    month INTEGER NOT NULL,
+    country TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    {_CATEGORY_SUMS},
+    sum_total REAL NOT NULL,
+    PRIMARY KEY (month, country)
+) WITHOUT ROWID;
+"""
+
+_INSERT = f"INSERT INTO footprints ({', '.join(_ROW_COLUMNS)}) VALUES ({', '.join('?' * len(_ROW_COLUMNS))})"
+_SUM_COLUMNS = tuple(f"sum_{category}" for category in CATEGORY_KEYS) + ("sum_total",)
+_UPSERT = (
+    f"INSERT INTO monthly_totals (month, country, n, {', '.join(_SUM_COLUMNS)}) "
+    f"VALUES (?, ?, ?, {', '.join('?' * len(_SUM_COLUMNS))}) "
+    f"ON CONFLICT (month, country) DO UPDATE SET n = n + excluded.n, "
+    + ", ".join(f"{column} = {column} + excluded.{column}" for column in _SUM_COLUMNS)
+)
+
+
+_salts = {}
+_salt_lock = threading.Lock()
+
+
+def history_salt(path=HISTORY_DB):
+    """``GREENPRINT_HISTORY_SALT``, else this install's random salt from ``<db>.salt`` (created 0600 on first use).
+
+    The salt must stay secret: anyone holding it and the database can hash a list of known emails
+    and match them against the user keys.
+    """
+    if HISTORY_SALT:
+        return HISTORY_SALT.encode("utf-8")
+    salt_path = os.path.abspath(path) + ".salt"
+    with _salt_lock:
+        if salt_path not in _salts:
+            os.makedirs(os.path.dirname(salt_path), exist_ok=True)
+            try:
+                fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                with open(salt_path, "rb") as f:
+                    salt = f.read()
+                if len(salt) < 16:
+                    raise RuntimeError(f"History salt file {salt_path} is truncated; restore it or remove the database")
+            else:
+                salt = secrets.token_bytes(32)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(salt)
+            _salts[salt_path] = salt
+        return _salts[salt_path]
+
+
+def anonymous_user_key(email, salt=None):
+    """Stable pseudonymous id for an email address; the address itself is never stored."""
+    salt = history_salt() if salt is None else salt
+    if isinstance(salt, str):
+        salt = salt.encode("utf-8")
+    normalised = (email or "").strip().lower()
+    return hashlib.sha256(salt + b":" + normalised.encode("utf-8")).hexdigest()[:32]
+
+
+def month_of(timestamp):
+    """yyyymm (UTC) of a Unix timestamp, e.g. 202610."""
+    t = time.gmtime(timestamp)
+    return t.tm_year * 100 + t.tm_mon
+
+
+def connect(path=HISTORY_DB):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")    # readers never block the writer thread
+    conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; fine for analytics rows
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class HistoryStore:
+    """Batched, append-only writer plus indexed trend and cohort queries."""
+
+    def __init__(self, path=HISTORY_DB, batch_size=256, flush_interval=1.0, max_queue=10_000, listeners=()):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._listeners = list(listeners)
+        connect(path).close()  # create the schema before the first read
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+
+    # --- Writing ---
+    def record(self, user_key, country, category_totals, total, age=None, gender=None, recorded_at=None):
+        """Queue one calculation; returns False (and counts a drop) if the queue is full."""
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        row = (user_key, recorded_at, month_of(recorded_at), country,
+               None if age is None else int(age), gender,
+               *(float(category_totals[category]) for category in CATEGORY_KEYS), float(total))
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def add_listener(self, callback):
+        """Call ``callback(rows)`` after each committed batch; rows are tuples in ``_ROW_COLUMNS`` order."""
+        self._listeners.append(callback)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _next_batch(self):
+        batch, events = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, threading.Event):
+                events.append(item)
+                break  # flush requested: write what we have now
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch, events
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            batch, events = self._next_batch()
+            if batch:
+                try:
+                    self._write(conn, batch)
+                except Exception as e:
+                    print(f"History write failed ({len(batch)} rows dropped): {e}")
+                    with self._lock:
+                        self.dropped += len(batch)
+            for event in events:
+                event.set()
+
+    def _write(self, conn, batch):
+        monthly = {}
+        first_sum = _ROW_COLUMNS.index(CATEGORY_KEYS[0])
+        for row in batch:
+            key = (row[2], row[3])
+            sums = monthly.setdefault(key, [0] + [0.0] * len(_SUM_COLUMNS))
+            sums[0] += 1
+            for i, value in enumerate(row[first_sum:]):
+                sums[i + 1] += value
+        with conn:  # one transaction per batch
+            conn.executemany(_INSERT, batch)
+            conn.executemany(_UPSERT, [(*key, *sums) for key, sums in monthly.items()])
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+        for callback in self._listeners:
+            try:
+                callback(batch)
+            except Exception as e:
+                print(f"History listener failed: {e}")
+
+    # --- Reading ---
+    def user_trend(self, user_key, limit=120):
+        """A user's calculations, oldest first (uses the (user_key, recorded_at) index)."""
+        columns = ("recorded_at", "country") + CATEGORY_KEYS + ("total",)
+        query = (f"SELECT {', '.join(columns)} FROM ("
+                 f"SELECT * FROM footprints WHERE user_key = ? ORDER BY recorded_at DESC LIMIT ?) ORDER BY recorded_at")
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            trend = pd.read_sql_query(query, conn, params=(user_key, limit))
+        trend["recorded_at"] = pd.to_datetime(trend["recorded_at"], unit="s")
+        return trend
+
+    def monthly_cohorts(self, country=None, since_month=None):
+        """Mean kg CO2 per category and in total, per month x country, from the summary table."""
+        where, params = [], []
+        if country is not None:
+            where.append("country = ?")
+            params.append(country)
+        if since_month is not None:
+            where.append("month >= ?")
+            params.append(since_month)
+        means = ", ".join(f"{column} / n AS {column[4:]}" for column in _SUM_COLUMNS)
+        query = f"SELECT month, country, n, {means} FROM monthly_totals"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            return pd.read_sql_query(query + " ORDER BY month, country", conn, params=params)
+
+    def stats(self):
+        with self._lock:
+            return {"written": self.written, "batches": self.batches, "dropped": self.dropped,
+                    "queued": self._queue.qsize()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the GreenPrint footprint history.")
+    parser.add_argument("command", choices=["cohorts", "trend"])
+    parser.add_argument("user_key", nargs="?", help="Anonymous user key (for 'trend')")
+    parser.add_argument("--db", default=HISTORY_DB)
+    parser.add_argument("--country", default=None)
+    parser.add_argument("--since", type=int, default=None, help="First month as yyyymm")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    if args.command == "trend":
+        if not args.user_key:
+            parser.error("trend needs a user_key")
+        print(store.user_trend(args.user_key).to_string(index=False))
+    else:
+        print(store.monthly_cohorts(country=args.country, since_month=args.since).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Timing spans for the app's hot paths, aggregated into in-process histograms.
+
+    with metrics.span("report.generate_pdf"):
+        ...
+
+    @metrics.timed("warmup.reference_data")
+    def load(): ...
+
+Spans are off unless ``GREENPRINT_METRICS=1``; when off, ``span()`` returns a
+shared no-op context manager, so instrumented code pays one attribute check.
+When on, each span name gets a Prometheus-style histogram (count, sum, max,
+cumulative buckets), served by ``serve()`` on ``GREENPRINT_METRICS_PORT``:
+
+    curl localhost:9464/metrics        # Prometheus text format
+    curl localhost:9464/metrics.json   # same data as JSON
+
+``session_profiling_toggle()`` adds a sidebar switch that also runs this
+session's spans under cProfile and shows the top functions.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("GREENPRINT_METRICS", "0") == "1"
+METRICS_PORT = int(os.environ.get("GREENPRINT_METRICS_PORT", "9464"))
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_NOOP = nullcontext()
+_local = threading.local()  # per script thread: cProfile.Profile of the current session, span depth
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        """{span: {"count", "sum", "mean", "max", "buckets": {le: cumulative count}}}"""
+        with self._lock:
+            snapshot = {}
+            for name, h in sorted(self._histograms.items()):
+                cumulative, buckets = 0, {}
+                for bound, count in zip(BUCKETS, h.buckets):
+                    cumulative += count
+                    buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+                snapshot[name] = {"count": h.count, "sum": h.sum, "mean": h.sum / h.count if h.count else 0.0,
+                                  "max": h.max, "buckets": buckets}
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+REGISTRY = Registry()
+
+
+class _Span:
+    __slots__ = ("name", "start", "profiler")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        # Only the outermost span switches the session's profiler on, so nested spans are not double-counted
+        self.profiler = getattr(_local, "profiler", None) if depth == 0 else None
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start)
+        if self.profiler is not None:
+            self.profiler.disable()
+        _local.depth -= 1
+        return False
+
+
+def span(name):
+    """Context manager timing the block into the ``name`` histogram (no-op when disabled)."""
+    return _Span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator form of ``span``."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- Export ---
+def to_json():
+    return json.dumps(REGISTRY.snapshot(), indent=2)
+
+
+def to_prometheus():
+    lines = [
+        "# HELP greenprint_span_seconds Wall time of instrumented GreenPrint stages.",
+        "# TYPE greenprint_span_seconds histogram",
+    ]
+    for name, h in REGISTRY.snapshot().items():
+        for bound, count in h["buckets"].items():
+            lines.append(f'greenprint_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+        lines.append(f'greenprint_span_seconds_sum{{span="{name}"}} {h["sum"]:.6f}')
+        lines.append(f'greenprint_span_seconds_count{{span="{name}"}} {h["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # keep scrapes out of the Streamlit log
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=METRICS_PORT, host="127.0.0.1"):
+    """Start the scrape endpoint once per process (only when metrics are enabled)."""
+    global _server
+    if not ENABLED:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return _server
+
+
+# --- Per-session cProfile ---
+def set_profiler(profiler):
+    """Profile spans run on this thread with ``profiler`` (a ``cProfile.Profile``), or stop with None."""
+    _local.profiler = profiler
+
+
+def profile_report(profiler, limit=25, sort="cumulative"):
+    out = io.StringIO()
+    try:
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    except TypeError:  # nothing recorded yet
+        return "No profiled spans yet."
+    return out.getvalue()
+
+
+def session_profiling_toggle():
+    """Sidebar switch that profiles this session's spans; call once near the top of a page."""
+    if not ENABLED:
+        return
+    import streamlit as st
+
+    enabled = st.sidebar.toggle("Profile this session (cProfile)", key="_metrics_profiling")
+    if not enabled:
+        st.session_state.pop("_metrics_profiler", None)
+        set_profiler(None)
+        return
+    profiler = st.session_state.setdefault("_metrics_profiler", cProfile.Profile())
+    set_profiler(profiler)
+    with st.sidebar.expander("Session profile"):
+        st.code(profile_report(profiler), language=None)
@@ -52,6 +52,7 @@ with st.form("profile_form"):
     gender = st.selectbox("Gender *", ["-- Select --", "Female", "Male", "Other", "Prefer not to say"], key="gender")
     email = st.text_input("Email Address *", key="email")
     consent = st.checkbox("I agree to participate in the carbon footprint analysis and share anonymous data for research.", key="consent")
+    st.caption("With your consent each calculation is stored without your name or email, so you can follow your footprint over time and help compare cohorts.")
 
     submitted = st.form_submit_button("Save Profile")
 
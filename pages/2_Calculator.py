@@ -1,15 +1,22 @@
 # -*- coding: utf-8 -*-
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
 # from reportlab.lib.pagesizes import A4 # PDF generation commented out
 # from reportlab.pdfgen import canvas    # PDF generation commented out
 # from reportlab.lib.units import cm     # PDF generation commented out
-from io import BytesIO
 import traceback
+import metrics
+import warmup
+from cohort_cube import CohortCube, age_band
+from history_store import HISTORY_DB, HistoryStore, anonymous_user_key
+from footprint_engine import ACTIVITIES, FootprintState, activity_factors, country_sweep
+from taxonomy import CATEGORIES, CATEGORY_KEYS, activity_label
 
 # --- App Config ---
 st.set_page_config(page_title="GreenPrint", page_icon="🌿", layout="centered")
+warmup.start()
+metrics.session_profiling_toggle()
 
 
 st.markdown("""
@@ -75,10 +82,15 @@ def init_session_state():
     defaults = {
         "selected_country": "-- Select --",
         "current_tab_index": 0,
-        "emission_values": {},
+        "footprint": FootprintState(),
         "calculation_done": False,
         "calculated_emission": None,
-        "comparison_plot_data": None
+        "comparison_plot_data": None,
+        "comparison_chart": None,
+        "country_sweep": None,
+        "sweep_chart": None,
+        "history_trend": None,
+        "history_error": None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -86,25 +98,33 @@ def init_session_state():
 
 init_session_state()
 
+@st.cache_resource(show_spinner=False)
+def init_history_store():
+    # One batched writer thread per server process; the cohort cube is built from the history
+    # before the writer starts and then follows each committed batch
+    cohort_cube = CohortCube.from_history(HISTORY_DB)
+    return HistoryStore(HISTORY_DB, listeners=[cohort_cube.add_rows]), cohort_cube
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def percentile_label(percentile):
+    # "1st" .. "99th": rounding must not turn "below everyone" into a 0th or "above everyone" into a 100th
+    return ordinal(min(max(round(percentile), 1), 99))
+
+def on_quantity_change(input_key, activity):
+    # Runs before the rerun: only this activity's emissions, its category subtotal and the total change
+    with metrics.span("calculator.input_update"):
+        st.session_state.footprint.set_quantity(activity, st.session_state[input_key])
+
 # --- Load Emission Data ---
-CSV_URL = "https://drive.google.com/uc?export=download&id=1PWeBZKB6adZKORvtMDLFwCX__gfzH33g"
-PER_CAPITA_URL = "https://raw.githubusercontent.com/keanyaoha/Final_Project_WBS/main/per_capita_filtered_monthly.csv"
-
-@st.cache_data
-def load_data(csv_url, per_capita_url):
-    try:
-        df_emis = pd.read_csv(csv_url)
-        df_cap = pd.read_csv(per_capita_url)
-        df_emis.columns = df_emis.columns.str.strip()
-        if 'Activity' not in df_emis.columns:
-             st.error("Emission data CSV is missing 'Activity' column.")
-             return None, None
-        return df_emis, df_cap
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return None, None
-
-df, df1 = load_data(CSV_URL, PER_CAPITA_URL)
+# Prefetched at server start by warmup.py; this only waits if it is still loading.
+try:
+    df, df1, factor_matrix, per_capita = warmup.get("reference_data")
+except Exception as e:
+    st.error(f"Error loading data: {e}")
+    df, df1, factor_matrix, per_capita = None, None, None, None
 
 if df is None or df1 is None:
     st.warning("Data loading failed. App cannot continue.")
@@ -112,24 +132,6 @@ if df is None or df1 is None:
 
 available_countries = sorted([col for col in df.columns if col != "Activity"])
 
-# --- Format Activity Titles ---
-def format_activity_name(activity_key):
-    mapping = {
-                  "Domestic_flight": "Domestic Flights", "International_flight": "International Flights",
-                  "Diesel_train_local": "Diesel Local Train", "Diesel_train_long": "Diesel Long-Dist Train",
-                  "Electric_train": "Electric Train", "Bus": "Bus",
-                  "Petrol_car": "Petrol Car", "Motorcycle": "Motorcycle",
-                  "Ev_scooter": "E-Scooter", "Ev_car": "Electric Car",
-                  "Diesel_car": "Diesel Car", "Beef": "Beef Products",
-                  "Poultry": "Poultry Products", "Beverages": "Beverages", "Pork": "Pork Products",
-                  "Fish_products": "Fish Products", "Other_meat": "Other Meat Products",
-                  "Rice": "Rice", "Sugar": "Sugar",
-                  "Oils_fats": "Veg Oils/Fats", "Dairy": "Dairy Products",
-                  "Other_food": "Other Food", "Water": "Water",
-                  "Electricity": "Electricity", "Hotel_stay": "Hotel Stay",
-    }
-    return mapping.get(activity_key, activity_key.replace("_", " ").capitalize())
-
 # --- App Title ---
 st.title("🌍 Carbon Footprint Calculator")
 st.markdown("Estimate your monthly carbon footprint and compare it to country and global averages.")
@@ -153,15 +155,23 @@ selected_country_widget = st.selectbox(
 if selected_country_widget != st.session_state.selected_country:
     st.session_state.selected_country = selected_country_widget
     st.session_state.current_tab_index = 0
-    st.session_state.emission_values = {}
+    st.session_state.footprint = FootprintState()
+    for category_key, activities in CATEGORIES.items():
+        for activity in activities:
+            st.session_state.pop(f"{category_key}_{activity}", None)  # inputs restart at 0 with the new state
     st.session_state.calculation_done = False
     st.session_state.calculated_emission = None
     st.session_state.comparison_plot_data = None
+    st.session_state.country_sweep = None
     st.rerun()
 
 # --- Main Content Area ---
 if st.session_state.selected_country != "-- Select --":
     country = st.session_state.selected_country
+    footprint = st.session_state.footprint
+    if footprint.country != country:
+        with metrics.span("calculator.factor_lookup"):
+            footprint.set_factors(country, activity_factors(factor_matrix, ACTIVITIES, country))
     st.markdown("**Enter your monthly consumption details**")
 
     tab_labels = ["🚗 Transport", "🍽️ Food", " ⚡💧 Energy & Water", "🏨 Hotel"]
@@ -175,45 +185,28 @@ if st.session_state.selected_country != "-- Select --":
         st.session_state.current_tab_index = clicked_index
         st.rerun()
 
-    def display_activity_inputs(activities, category_key, current_country):
-        if not isinstance(activities, list): return
+    def display_activity_inputs(activities, category_key):
+        if not isinstance(activities, (list, tuple)): return
         for activity in activities:
-            label = format_activity_name(activity)
+            label = activity_label(activity)
             input_key = f"{category_key}_{activity}"
-            if f"{input_key}_input" not in st.session_state.emission_values:
-                 st.session_state.emission_values[f"{input_key}_input"] = 0.0
-            default_value = st.session_state.emission_values.get(f"{input_key}_input", 0.0)
-            user_input = st.number_input(label, min_value=0.0, step=0.1, key=input_key, value=float(default_value))
-            st.session_state.emission_values[f"{input_key}_input"] = user_input
-            try:
-                if activity not in df['Activity'].values:
-                     st.session_state.emission_values[activity] = 0.0
-                     continue
-                factor_series = df.loc[df["Activity"] == activity, current_country]
-                if not factor_series.empty:
-                    factor = factor_series.iloc[0]
-                    st.session_state.emission_values[activity] = 0.0 if pd.isna(factor) else user_input * float(factor)
-                else:
-                    st.session_state.emission_values[activity] = 0.0
-            except Exception as e:
-                # Keep error reporting minimal unless debugging
-                # st.error(f"Calc error for {label}: {e}")
-                st.session_state.emission_values[activity] = 0.0
+            st.number_input(label, min_value=0.0, step=0.1, key=input_key, value=footprint.quantity(activity),
+                            on_change=on_quantity_change, args=(input_key, activity))
 
     # Define Activity Lists
-    transport_activities = ["Domestic_flight", "International_flight", "Diesel_train_local", "Diesel_train_long", "Electric_train",  "Bus", "Petrol_car", "Ev_car", "Ev_scooter", "Motorcycle", "Diesel_car"]
-    food_activities = ["Beef", "Poultry", "Pork", "Dairy", "Fish_products", "Rice", "Sugar", "Oils_fats", "Other_food", "Beverages", "Other_meat"]
-    energy_water_activities = ["Electricity", "Water"]
-    hotel_activities = ["Hotel_stay"]
+    transport_activities = CATEGORIES["transport"]
+    food_activities = CATEGORIES["food"]
+    energy_water_activities = CATEGORIES["energy"]
+    hotel_activities = CATEGORIES["hotel"]
 
     # Display Tabs
     current_index = st.session_state.current_tab_index
     if current_index == 0:
-        display_activity_inputs(transport_activities, "transport", country)
+        display_activity_inputs(transport_activities, "transport")
         if st.button("Next →", key="next_transport", use_container_width=False):
             st.session_state.current_tab_index = 1; st.rerun()
     elif current_index == 1:
-        display_activity_inputs(food_activities, "food", country)
+        display_activity_inputs(food_activities, "food")
         col1, col2 = st.columns(2)
         with col1:
             if st.button("← Previous", key="prev_food", use_container_width=False):
@@ -222,7 +215,7 @@ if st.session_state.selected_country != "-- Select --":
             if st.button("Next →", key="next_food", use_container_width=False):
                 st.session_state.current_tab_index = 2; st.rerun()
     elif current_index == 2:
-        display_activity_inputs(energy_water_activities, "energy", country)
+        display_activity_inputs(energy_water_activities, "energy")
         col1, col2 = st.columns(2)
         with col1:
             if st.button("← Previous", key="prev_energy", use_container_width=False):
@@ -231,7 +224,7 @@ if st.session_state.selected_country != "-- Select --":
             if st.button("Next →", key="next_energy", use_container_width=False):
                 st.session_state.current_tab_index = 3; st.rerun()
     elif current_index == 3:
-        display_activity_inputs(hotel_activities, "hotel", country)
+        display_activity_inputs(hotel_activities, "hotel")
         if st.button("← Previous", key="prev_hotel", use_container_width=False):
             st.session_state.current_tab_index = 2; st.rerun()
 
@@ -241,20 +234,33 @@ if st.session_state.selected_country != "-- Select --":
         reviewed_all = st.checkbox("I have reviewed/entered my data for all categories.", key="review_final_check")
         if reviewed_all:
             if st.button("Calculate My Carbon Footprint", type="primary", use_container_width=True, key="calculate_final_button"):
-                emission_values_to_sum = {k: v for k, v in st.session_state.emission_values.items() if not k.endswith('_input') and isinstance(v, (int, float)) and v > 0}
-                if not emission_values_to_sum:
+                if not footprint.total > 0:
                      st.warning("No positive emissions calculated.")
                      st.session_state.calculation_done = False
                 else:
-                    st.session_state.calculated_emission = sum(emission_values_to_sum.values())
-                    def get_avg(name, df_avg):
-                        if df_avg is None or "Country" not in df_avg.columns or "PerCapitaCO2" not in df_avg.columns: return None
-                        match = df_avg.loc[df_avg["Country"] == name, "PerCapitaCO2"]
-                        return match.iloc[0] if not match.empty and pd.notna(match.iloc[0]) else None
+                    st.session_state.calculated_emission = footprint.total
                     st.session_state.comparison_plot_data = {
-                         "country": {"name": country, "avg": get_avg(country, df1)},
-                         "eu": {"name": "EU Average", "avg": get_avg("European Union (27)", df1)},
-                         "world": {"name": "World Average", "avg": get_avg("World", df1)}}
+                         "country": {"name": country, "avg": per_capita.average(country)},
+                         "eu": {"name": "EU Average", "avg": per_capita.eu},
+                         "world": {"name": "World Average", "avg": per_capita.world}}
+                    # Same inputs under every country's factors: one vector x matrix product, sorted once
+                    with metrics.span("calculator.country_sweep"):
+                        st.session_state.country_sweep = country_sweep(footprint.quantities, factor_matrix)
+                    st.session_state.sweep_chart = None
+                    # Consenting users: queue an anonymous row (written in the background) and load their trend
+                    profile = st.session_state.get("user_profile") or {}
+                    st.session_state.history_trend = None
+                    st.session_state.history_error = None
+                    if profile.get("consent") and profile.get("email"):
+                        try:
+                            with metrics.span("calculator.history"):
+                                history_store, _ = init_history_store()
+                                user_key = anonymous_user_key(profile["email"])
+                                st.session_state.history_trend = history_store.user_trend(user_key)
+                                history_store.record(user_key, country, dict(zip(CATEGORY_KEYS, footprint.category_totals)),
+                                                     footprint.total, age=profile.get("age"), gender=profile.get("gender"))
+                        except Exception as history_err:
+                            st.session_state.history_error = str(history_err)  # shown with the results after the rerun
                     st.session_state.calculation_done = True
                     st.rerun()
         else:
@@ -262,6 +268,7 @@ if st.session_state.selected_country != "-- Select --":
 
     # --- Display Results Area ---
     if st.session_state.get('calculation_done', False):
+        import plotly.express as px  # only the results need plotly; the input form paints without it
         st.divider()
         st.subheader("📊 Your Estimated Monthly Carbon Footprint:")
         total_emission = st.session_state.get('calculated_emission', 0)
@@ -271,95 +278,168 @@ if st.session_state.selected_country != "-- Select --":
             if tree_absorb_monthly > 0:
                  trees_monthly_equiv = total_emission / tree_absorb_monthly
                  st.markdown(f"Equivalent to CO₂ absorbed by **{trees_monthly_equiv:.1f} trees** in a month.")
+            percentile = per_capita.percentile(total_emission)
+            if percentile == 0:
+                st.markdown("Your footprint is **below every country's** national per-capita average.")
+            elif percentile == 100:
+                st.markdown("Your footprint is **above every country's** national per-capita average.")
+            elif percentile is not None:
+                st.markdown(f"You are in the **{percentile_label(percentile)} percentile** of national per-capita averages "
+                            f"(higher than {percentile:.0f}% of countries).")
+
+            # --- GreenPrint Community (live cohort cube) ---
+            try:
+                _, cohort_cube = init_history_store()
+            except Exception as cube_err:
+                st.warning(f"GreenPrint community statistics are unavailable: {cube_err}")
+                cohort_cube = None
+            if cohort_cube is not None:
+                profile = st.session_state.get("user_profile") or {}
+                band = age_band(profile.get("age")) if profile.get("age") else None
+                with metrics.span("calculator.cohort_query"):
+                    cell = cohort_cube.best_cell(country, band, profile.get("gender"))
+                    if cell is not None:
+                        cell_stats = cohort_cube.stats(*cell)
+                        cohort_percentile = cohort_cube.percentile(total_emission, *cell)
+                if cell is not None:
+                    cohort_name = ", ".join(part for part in cell if part) or "all countries"
+                    st.markdown(f"Among **{cell_stats['count']:,}** GreenPrint users ({cohort_name}) you are in the "
+                                f"**{percentile_label(cohort_percentile)} percentile**; their average is "
+                                f"**{cell_stats['mean']:.1f} kg** CO₂ per month.")
 
             st.divider()
             st.subheader("📈 Comparison with Averages")
-            comparison_data = st.session_state.get('comparison_plot_data')
-            plot_data_list = []
-            captions = []
-            world_avg_value = None # Initialize world average value
-
-            # Get World Average for conditional coloring and target line check
-            if comparison_data and comparison_data.get('world'):
-                world_avg_value = comparison_data['world'].get('avg')
-
-            # --- Conditional Color Logic ---
-            you_color = '#1a9850' # Default Green
-            color_reason = ""
-            if world_avg_value is not None:
-                if total_emission > world_avg_value:
+            # The figure is only rebuilt when the total (or country) changes; other reruns reuse it
+            chart_key = (total_emission, country)
+            cached_chart = st.session_state.get("comparison_chart")
+            if cached_chart is None or cached_chart[0] != chart_key:
+                comparison_data = st.session_state.get('comparison_plot_data')
+                plot_data_list = []
+                captions = []
+                world_avg_value = None # Initialize world average value
+
+                # Get World Average for conditional coloring and target line check
+                if comparison_data and comparison_data.get('world'):
+                    world_avg_value = comparison_data['world'].get('avg')
+
+                # --- Conditional Color Logic ---
+                you_color = '#1a9850' # Default Green
+                if world_avg_value is not None and total_emission > world_avg_value:
                     you_color = '#e41a1c' # Red
-                    color_reason = "(above world average)"
-                else:
-                     color_reason = "(below or equal to world average)"
-            color_map = {'You': you_color, 'Average': '#a6cee3'} # Light Blue for Averages
-            # --------------------------------
-
-            # Add data to plot list
-            plot_data_list.append({"Source": "You", "Emissions": total_emission, "Type": "You"})
-
-            if comparison_data:
-                # Iterate and add comparison averages safely
-                for key, type_label, default_name in [("country", "Average", country), ("eu", "Average", "EU Average"), ("world", "Average", "World Average")]:
-                    data = comparison_data.get(key, {})
-                    avg = data.get("avg")
-                    name = data.get("name", default_name)
-                    if avg is not None:
-                         # Don't add 'You' again if it matches country name (edge case)
-                         if name != "You":
-                            plot_data_list.append({"Source": name, "Emissions": avg, "Type": type_label})
-                    else:
-                         # Only add caption if the average was expected but missing
-                         if key in comparison_data:
-                            captions.append(f"Note: Average data for {name} not available.")
+                color_map = {'You': you_color, 'Average': '#a6cee3'} # Light Blue for Averages
+                # --------------------------------
+
+                # Add data to plot list
+                plot_data_list.append({"Source": "You", "Emissions": total_emission, "Type": "You"})
+
+                if comparison_data:
+                    # Iterate and add comparison averages safely
+                    for key, type_label, default_name in [("country", "Average", country), ("eu", "Average", "EU Average"), ("world", "Average", "World Average")]:
+                        data = comparison_data.get(key, {})
+                        avg = data.get("avg")
+                        name = data.get("name", default_name)
+                        if avg is not None:
+                             # Don't add 'You' again if it matches country name (edge case)
+                             if name != "You":
+                                plot_data_list.append({"Source": name, "Emissions": avg, "Type": type_label})
+                        else:
+                             # Only add caption if the average was expected but missing
+                             if key in comparison_data:
+                                captions.append(f"Note: Average data for {name} not available.")
+
+                # Plotting section
+                fig_comp, chart_error = None, None
+                if plot_data_list:
+                    df_comparison = pd.DataFrame(plot_data_list)
+
+                    try:
+                        with metrics.span("calculator.comparison_figure"):
+                            fig_comp = px.bar(
+                                df_comparison.sort_values("Emissions", ascending=True),
+                                x="Emissions", y="Source", orientation='h',
+                                color="Type", color_discrete_map=color_map, text="Emissions",
+                                # title="Monthly Carbon Footprint Comparison", # Title embedded in subheader now
+                                labels={'Emissions': 'kg CO₂ per month', 'Source': '', 'Type': 'Category'}
+                            )
+
+
+                            # Update traces (styling for bars and hover)
+                            fig_comp.update_traces(
+                                 texttemplate='%{text:.1f}', textposition='outside',
+                                 hovertemplate="<b>%{y}</b><br>Emission: %{x:.1f} kg CO₂<extra></extra>",
+                                 width=0.5                  
+                                 )
+
+                            # Update layout (styling for overall chart)
+                            fig_comp.update_layout(
+                                 yaxis={'categoryorder':'total ascending'}, # Order bars by value
+                                 bargap=0.6, # Adjust gap between bars (controls thickness)
+                                 height=300,
+                                 margin=dict(l=5, r=5, t=30, b=20), # Adjust top margin for title space
+                                 showlegend=False,
+                                 # title_text="Monthly Carbon Footprint Comparison", # Use layout title
+                                 # title_x=0.5, # Center title
+                                 # title_font_size=16
+                            )
+
+                    except Exception as plot_error:
+                        fig_comp = None
+                        chart_error = (f"Error generating plot: {plot_error}", traceback.format_exc()) # Show detailed traceback for debugging
+                st.session_state.comparison_chart = (chart_key, captions, fig_comp, chart_error)
+            _, captions, fig_comp, chart_error = st.session_state.comparison_chart
 
             # Display notes about missing data
             for caption in captions:
                 st.caption(caption)
 
-            # Plotting section
-            if plot_data_list:
-                df_comparison = pd.DataFrame(plot_data_list)
-
-                # Define sustainability target
-                sustainable_target = 167 # kg CO2e/month (~2 tonnes/year)
-
-                try:
-                    fig_comp = px.bar(
-                        df_comparison.sort_values("Emissions", ascending=True),
-                        x="Emissions", y="Source", orientation='h',
-                        color="Type", color_discrete_map=color_map, text="Emissions",
-                        # title="Monthly Carbon Footprint Comparison", # Title embedded in subheader now
-                        labels={'Emissions': 'kg CO₂ per month', 'Source': '', 'Type': 'Category'}
-                    )
-
-
-                    # Update traces (styling for bars and hover)
-                    fig_comp.update_traces(
-                         texttemplate='%{text:.1f}', textposition='outside',
-                         hovertemplate="<b>%{y}</b><br>Emission: %{x:.1f} kg CO₂<extra></extra>",
-                         width=0.5                  
-                         )
-
-                    # Update layout (styling for overall chart)
-                    fig_comp.update_layout(
-                         yaxis={'categoryorder':'total ascending'}, # Order bars by value
-                         bargap=0.6, # Adjust gap between bars (controls thickness)
-                         height=300,
-                         margin=dict(l=5, r=5, t=30, b=20), # Adjust top margin for title space
-                         showlegend=False,
-                         # title_text="Monthly Carbon Footprint Comparison", # Use layout title
-                         # title_x=0.5, # Center title
-                         # title_font_size=16
-                    )
-
-                    st.plotly_chart(fig_comp, use_container_width=True)
-
-                except Exception as plot_error:
-                    st.error(f"Error generating plot: {plot_error}")
-                    st.error(traceback.format_exc()) # Show detailed traceback for debugging
+            if fig_comp is not None:
+                st.plotly_chart(fig_comp, use_container_width=True)
+            elif chart_error:
+                st.error(chart_error[0])
+                st.error(chart_error[1])
             else:
                 st.warning("No data available for comparison plot.")
+
+            # --- Same Lifestyle in Other Countries ---
+            sweep = st.session_state.get('country_sweep')
+            if sweep is not None and len(sweep) > 1:
+                st.divider()
+                st.subheader("🌐 Your Lifestyle in Other Countries")
+                st.markdown(f"The same consumption would emit least in **{sweep.index[0]}** ({sweep.iloc[0]:.1f} kg) "
+                            f"and most in **{sweep.index[-1]}** ({sweep.iloc[-1]:.1f} kg).")
+                n_incomplete = len(factor_matrix[2]) - len(sweep)
+                if n_incomplete:
+                    st.caption(f"{n_incomplete} countries without emission factors for some of your activities are not shown.")
+                if st.session_state.get("sweep_chart") is None:  # built once per calculation
+                    with metrics.span("calculator.sweep_figure"):
+                        df_sweep = sweep.rename_axis("Country").reset_index()
+                        df_sweep["Type"] = np.where(df_sweep["Country"] == country, "You", "Other")
+                        fig_sweep = px.bar(
+                            df_sweep, x="total", y="Country", orientation='h',
+                            color="Type", color_discrete_map={'You': '#1a9850', 'Other': '#a6cee3'},
+                            labels={'total': 'kg CO₂ per month', 'Country': ''}
+                        )
+                        fig_sweep.update_layout(
+                             yaxis={'categoryorder':'total ascending'},
+                             height=max(300, 22 * len(df_sweep)),
+                             margin=dict(l=5, r=5, t=30, b=20),
+                             showlegend=False,
+                        )
+                    st.session_state.sweep_chart = fig_sweep
+                st.plotly_chart(st.session_state.sweep_chart, use_container_width=True)
+
+            # --- Your History (consenting users) ---
+            if st.session_state.get('history_error'):
+                st.warning(f"This calculation could not be saved to your history: {st.session_state.history_error}")
+            history_trend = st.session_state.get('history_trend')
+            if history_trend is not None and not history_trend.empty:
+                st.divider()
+                st.subheader("📅 Your Footprint Over Time")
+                df_history = pd.concat([
+                    history_trend[["recorded_at", "total"]],
+                    pd.DataFrame({"recorded_at": [pd.Timestamp.now("UTC").tz_localize(None)], "total": [total_emission]}),
+                ], ignore_index=True)
+                st.line_chart(df_history, x="recorded_at", y="total", x_label="", y_label="kg CO₂ per month")
         else:
             st.info("Your calculated emissions are zero. Nothing to display.")
 
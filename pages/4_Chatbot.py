@@ -1,12 +1,12 @@
 # Import necessary libraries
-from llama_index.llms.huggingface import HuggingFaceInferenceAPI
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.core import StorageContext, load_index_from_storage
-from llama_index.core.chat_engine import ContextChatEngine
-from llama_index.core.memory import ChatMemoryBuffer
-from llama_index.core.base.llms.types import ChatMessage, MessageRole
+# llama_index (and torch, through the embedder) is imported only once a chat message is sent,
+# so the page paints without waiting for it
 import streamlit as st
-import os
+import time
+import metrics
+import warmup
+from greenprint_ai.resources import STREAM_RESPONSES
+from greenprint_ai.streaming import LatencyTracker, TimedTokens
 
 
 # --- App Config ---
@@ -15,6 +15,8 @@ st.set_page_config(
     page_icon="🌿",
     layout="centered"
 )
+warmup.start()
+metrics.session_profiling_toggle()
 
 # --- Force Logo to Appear at Top of Sidebar ---
 st.markdown(
@@ -55,33 +57,64 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# --- Streamlit UI ---
+st.title("💬 GreenPrint AI")
 
-# --- Configuration ---
+# st.markdown("""
+# <div class="chat-title">CarbonFootprint Chatbot</div>
+# """, unsafe_allow_html=True)
 
-# LLM Configuration (Fixed)
-hf_model = "mistralai/Mistral-7B-Instruct-v0.3"
-llm = HuggingFaceInferenceAPI(model_name=hf_model)
+prompt = st.chat_input("Curious minds wanted!")
+if not prompt and "chat_session_id" not in st.session_state:
+    # Nothing to answer yet: stop before the models and llama_index are needed
+    st.caption("Ask anything about carbon footprints and how to shrink yours.")
+    st.stop()
+
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.chat_engine import ContextChatEngine
+from greenprint_ai.cache import AnswerCache, CachedQueryEmbedding, PrefetchedRetriever
+from greenprint_ai.sessions import SessionEnginePool
 
-# Embeddings Configuration
-embedding_model = "sentence-transformers/all-MiniLM-l6-v2"
-embeddings = HuggingFaceEmbedding(model_name=embedding_model)
 
-# Vector Database Configuration
-persist_directory = "vector_index"
+# --- Configuration ---
 
-if not os.path.exists(persist_directory):
-    st.error(f"❌ Error: Vector index directory '{persist_directory}' not found. Make sure it's in your GitHub repository root.")
+# LLM, Embeddings + Vector Database (loaded by warmup.py on the first chat message, see GREENPRINT_DEFER_WARMUP;
+# hosted vs local LLM is chosen by GREENPRINT_LLM_BACKEND, see greenprint_ai/resources.py)
+try:
+    with st.spinner("🌱 Loading GreenPrint AI..."):
+        embeddings, vector_index = warmup.get("chatbot_index")
+except Exception as e:
+    st.error(f"❌ Error loading vector index: {e}")
     st.stop()
 
 try:
-    storage_context = StorageContext.from_defaults(persist_dir=persist_directory)
-    vector_index = load_index_from_storage(storage_context, embed_model=embeddings)
+    with st.spinner("🌱 Loading language model..."):
+        llm = warmup.get("llm")
 except Exception as e:
-    st.error(f"❌ Error loading vector index from '{persist_directory}': {e}")
+    st.error(f"❌ Error loading language model: {e}")
     st.stop()
 
-# Retriever Configuration
-retriever = vector_index.as_retriever(similarity_top_k=2)
+# Cache Configuration (shared by all sessions): prompt -> embedding, (context, prompt) -> answer
+@st.cache_resource
+def init_caches(_embeddings):
+    return CachedQueryEmbedding(_embeddings), AnswerCache()
+
+query_embeddings, answer_cache = init_caches(embeddings)
+
+# Time to first token (streamed answers) and full answer time (non-streamed) are kept apart
+@st.cache_resource
+def init_latency_trackers():
+    return LatencyTracker(), LatencyTracker()
+
+ttft_tracker, total_latency_tracker = init_latency_trackers()
+
+# Retriever Configuration: the page retrieves once per prompt (for the answer cache key) and the
+# engine reuses those nodes on a cache miss
+@st.cache_resource
+def init_retriever(_vector_index, _query_embeddings):
+    return PrefetchedRetriever(_vector_index.as_retriever(similarity_top_k=2, embed_model=_query_embeddings))
+
+retriever = init_retriever(vector_index, query_embeddings)
 
 # Prompt Configuration
 prompts = [
@@ -90,36 +123,33 @@ prompts = [
     ChatMessage(role=MessageRole.SYSTEM, content="Keep your answers short and succinct.")
 ]
 
-# Memory Configuration
-memory = ChatMemoryBuffer.from_defaults()
-
 # --- Bot Initialization ---
+# One engine + bounded memory per browser session; models, index and caches stay shared.
 @st.cache_resource
-def init_bot():
-    try:
-        engine = ContextChatEngine.from_defaults(
-            llm=llm,
-            retriever=retriever,
+def init_session_pool(_llm, _retriever):
+    def build_engine(memory):
+        return ContextChatEngine.from_defaults(
+            llm=_llm,
+            retriever=_retriever,
             memory=memory,
             prefix_messages=prompts,
             verbose=True
         )
-        return engine
-    except Exception as e:
-        st.error(f"❌ Failed to initialize chatbot engine: {e}")
-        return None
+    return SessionEnginePool(build_engine)
 
-rag_bot = init_bot()
+session_pool = init_session_pool(llm, retriever)
 
-if rag_bot is None:
-    st.stop()
+if "chat_session_id" not in st.session_state:
+    st.session_state.chat_session_id = SessionEnginePool.new_session_id()
 
-# --- Streamlit UI ---
-st.title("💬 GreenPrint AI")
+try:
+    chat_session = session_pool.get(st.session_state.chat_session_id)
+except Exception as e:
+    st.error(f"❌ Failed to initialize chatbot engine: {e}")
+    st.stop()
 
-# st.markdown("""
-# <div class="chat-title">CarbonFootprint Chatbot</div>
-# """, unsafe_allow_html=True)
+rag_bot = chat_session.engine
+memory = chat_session.memory
 
 # Display chat messages from history
 if hasattr(rag_bot, 'chat_history') and rag_bot.chat_history:
@@ -135,15 +165,60 @@ if hasattr(rag_bot, 'chat_history') and rag_bot.chat_history:
             st.markdown(content)
 
 # User input and response handling
-if prompt := st.chat_input("Curious minds wanted!"):
+if prompt:
     st.chat_message("user").markdown(prompt)
-    with st.spinner("🔍 Digging for answers..."):
-        try:
-            answer = rag_bot.chat(prompt)
-            response_text = getattr(answer, 'response', '❌ Sorry, I could not process that.')
-            with st.chat_message("assistant"):
+    start = time.perf_counter()
+    try:
+        with st.spinner("🔍 Digging for answers..."):
+            with metrics.span("chatbot.embed_query"):
+                query_embedding = query_embeddings.get_query_embedding(prompt)
+            with metrics.span("chatbot.retrieve"):
+                nodes = retriever.retrieve_for(prompt, query_embedding)
+            node_ids = [n.node.node_id for n in nodes]
+            # The engine answers from the history too, so it is part of the cache key
+            history = memory.get(input=prompt)
+            response_text = answer_cache.lookup(node_ids, prompt, query_embedding, history)
+            if response_text is not None:
+                # Cached answer: record the turn so the history stays complete
+                memory.put(ChatMessage(role=MessageRole.USER, content=prompt))
+                memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=response_text))
+            elif not STREAM_RESPONSES:
+                with metrics.span("chatbot.llm"):
+                    answer = rag_bot.chat(prompt)
+                response_text = getattr(answer, 'response', '❌ Sorry, I could not process that.')
+                if hasattr(answer, 'response'):
+                    answer_cache.store(node_ids, prompt, query_embedding, response_text, history)
+                total_latency_tracker.record(time.perf_counter() - start)
+
+        with st.chat_message("assistant"):
+            if response_text is None:
+                # Render tokens as Mistral produces them; memory is updated when the stream ends
+                with metrics.span("chatbot.llm_stream"):  # includes the engine's context build and request start
+                    tokens = TimedTokens(rag_bot.stream_chat(prompt).response_gen, start, ttft_tracker)
+                    response_text = st.write_stream(tokens)
+                answer_cache.store(node_ids, prompt, query_embedding, response_text, history)
+                if tokens.time_to_first_token is not None:
+                    st.caption(f"First token after {tokens.time_to_first_token:.2f}s")
+            else:
                 st.markdown(response_text)
-        except Exception as e:
-            st.error(f"Error during chat processing: {e}")
-            with st.chat_message("assistant"):
-                st.markdown("❌ Sorry, an error occurred while trying to get an answer.")
+    except Exception as e:
+        st.error(f"Error during chat processing: {e}")
+        with st.chat_message("assistant"):
+            st.markdown("❌ Sorry, an error occurred while trying to get an answer.")
+    session_pool.trim(chat_session)
+
+# --- Cache statistics ---
+with st.sidebar.expander("⚡ Cache stats"):
+    st.caption("Query embeddings")
+    st.json(query_embeddings.stats())
+    st.caption("Answers")
+    st.json(answer_cache.stats())
+    st.caption("Time to first token")
+    st.json(ttft_tracker.stats())
+    st.caption("Full answer time (streaming off)")
+    st.json(total_latency_tracker.stats())
+    st.caption("Chat sessions")
+    st.json(session_pool.stats())
+    if hasattr(llm, "scheduler"):
+        st.caption("Local model scheduler")
+        st.json(llm.scheduler.stats())
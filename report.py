@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""PDF report for the Breakdown page, plus a bounded cache of rendered charts and PDFs.
+
+Charts and PDFs are keyed by a fingerprint of the category totals and the
+top-N activities, so reruns that change nothing reuse the bytes instead of
+starting kaleido and ReportLab again.
+
+Only ``reportlab.lib`` (units and page sizes) is imported up front; the
+canvas and chart modules load on the first PDF, so pages that import this
+module for the breakdown helpers do not pay for them.
+"""
+import hashlib
+import json
+import os
+import threading
+import traceback # For detailed error logging
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+
+import metrics
+from taxonomy import CATEGORY_KEYS, CATEGORY_LABELS, activity_label, category_totals, to_vector
+
+# --- Constants ---
+MARGIN = 1.8 * cm
+CO2_SUB = "CO\u2082" # Unicode for subscript 2 - Ensure your PDF viewer/font supports it
+
+# "native": vector bar charts drawn with ReportLab; "kaleido": embed Plotly PNGs (falls back to native)
+PDF_CHART_RENDERER = os.environ.get("GREENPRINT_PDF_CHARTS", "native")
+GREENS = ("#c7e9c0", "#00441b")  # light -> dark, like Plotly's "Greens"
+BLUES = ("#c6dbef", "#08306b")   # like Plotly's "Blues"
+
+
+# --- Breakdown Data (shared by the Breakdown page and report_batch.py) ---
+def category_totals_for(emissions):
+    """{category label: total} for an {activity: emissions} dict, keeping only positive totals."""
+    totals = category_totals(to_vector(emissions))
+    return {CATEGORY_LABELS[key]: float(total) for key, total in zip(CATEGORY_KEYS, totals) if total > 0}
+
+
+def top_activities_for(emissions, top_n=10):
+    """The ``top_n`` largest positive activity emissions, largest first."""
+    positive = sorted(((k, v) for k, v in emissions.items() if v > 0), key=lambda item: item[1], reverse=True)
+    return dict(positive[:top_n])
+
+
+# --- Native Vector Charts ---
+def build_bar_chart(data, width, max_height, palette, label_width=4.2*cm):
+    """Horizontal bar chart of {label: value} as a ReportLab Drawing, largest bar on top."""
+    from reportlab.lib import colors
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing, String
+
+    items = sorted(data.items(), key=lambda item: item[1])  # the first category is drawn at the bottom
+    labels = [label for label, _ in items]
+    values = [float(value) for _, value in items]
+    vmax = max(values) if values and max(values) > 0 else 1.0
+    height = min(max_height, 0.75*cm*len(values) + 1.6*cm)
+
+    drawing = Drawing(width, height)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = label_width, 1.0*cm
+    chart.width, chart.height = width - label_width - 1.2*cm, height - 1.2*cm
+    chart.data = [values]
+    chart.bars.strokeColor = None
+    for i, value in enumerate(values):
+        chart.bars[(0, i)].fillColor = colors.linearlyInterpolatedColor(
+            colors.HexColor(palette[0]), colors.HexColor(palette[1]), 0, 1, value / vmax)
+    chart.barLabelFormat = "%.1f"
+    chart.barLabels.boxAnchor = "w"
+    chart.barLabels.dx = 3
+    chart.barLabels.fontName, chart.barLabels.fontSize = "Helvetica", 7.5
+
+    chart.categoryAxis.categoryNames = labels
+    chart.categoryAxis.labels.boxAnchor = "e"
+    chart.categoryAxis.labels.dx = -4
+    chart.categoryAxis.labels.fontName, chart.categoryAxis.labels.fontSize = "Helvetica", 8
+    chart.categoryAxis.visibleTicks = False
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = vmax * 1.15  # room for the value labels
+    chart.valueAxis.labels.fontName, chart.valueAxis.labels.fontSize = "Helvetica", 7
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = colors.HexColor("#e5e5e5")
+    drawing.add(chart)
+    drawing.add(String(chart.x + chart.width / 2, 0.1*cm, f"Emissions (kg {CO2_SUB})",
+                       fontName="Helvetica", fontSize=8, textAnchor="middle"))
+    return drawing
+
+
+def draw_native_chart(c, data, y_pos, max_height, palette):
+    """Draw ``build_bar_chart`` at ``y_pos`` (starting a new page if needed); returns the new y_pos."""
+    from reportlab.graphics import renderPDF
+
+    width, height = A4
+    drawing = build_bar_chart(data, width - 2*MARGIN, max_height, palette)
+    if y_pos - drawing.height < MARGIN:
+        c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN - 0.3*cm
+    renderPDF.draw(drawing, c, MARGIN, y_pos - drawing.height)
+    return y_pos - (drawing.height + 0.6*cm)
+
+# --- Enhanced PDF Report Generator with Images ---
+# Charts come from fig1/fig2 PNG data when given, otherwise they are drawn as vector graphics.
+@metrics.timed("report.generate_pdf")
+def generate_pdf_report(logo_data, category_data, top_activities_data, fig1_img_data=None, fig2_img_data=None):
+    from reportlab.lib.utils import ImageReader # To read image data for ReportLab
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    try:
+        c = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+
+        # --- Draw Logo ---
+        logo_height = 0
+        if logo_data:
+            try:
+                logo_img = ImageReader(logo_data)
+                img_w, img_h = logo_img.getSize()
+                aspect = img_h / float(img_w) if img_w > 0 else 1
+                draw_width = 5.5 * cm # Slightly larger logo
+                draw_height = draw_width * aspect
+                logo_height = draw_height
+                c.drawImage(logo_img, width - MARGIN - draw_width, height - MARGIN - draw_height,
+                            width=draw_width, height=draw_height, preserveAspectRatio=True, mask='auto')
+            except Exception as logo_err:
+                print(f"Error drawing logo: {logo_err}")
+
+        # --- Title ---
+        c.setFont("Helvetica-Bold", 16)
+        title_y = height - MARGIN - (logo_height / 2 if logo_height > 0 else 0) - 0.5 * cm
+        c.drawCentredString(width / 2.0, title_y, "GreenPrint Carbon Footprint Report")
+        y_pos = title_y - 1.5 * cm # Start below title/logo
+
+        # --- Section 1: Emission by Category (Text) ---
+        c.setFont("Helvetica-Bold", 12)
+        if y_pos < MARGIN + 2*cm: c.showPage(); c.setFont("Helvetica-Bold", 12); y_pos = height - MARGIN # New page if needed
+        c.drawString(MARGIN, y_pos, f"Emission by Category:")
+        c.setFont("Helvetica", 9.5)
+        y_pos -= 0.6 * cm
+
+        if isinstance(category_data, dict) and category_data:
+            for category, emission in category_data.items():
+                if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                emission_val = emission if isinstance(emission, (int, float)) else 0
+                c.drawString(MARGIN + 0.5*cm, y_pos, f"• {category}: {emission_val:.2f} kg {CO2_SUB}") # Use subscript
+                y_pos -= 0.55 * cm
+        else:
+             if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+             c.drawString(MARGIN + 0.5*cm, y_pos, "Category data unavailable.")
+             y_pos -= 0.55*cm
+
+        # --- Draw Category Graph (fig1) ---
+        y_pos -= 0.4 * cm # Space before graph
+        if fig1_img_data:
+            try:
+                graph1_img = ImageReader(fig1_img_data)
+                img_w, img_h = graph1_img.getSize()
+                aspect = img_h / float(img_w) if img_w > 0 else 1
+                draw_width = width - (2 * MARGIN)
+                draw_height = draw_width * aspect
+                max_graph_height = 7*cm # Limit height
+                if draw_height > max_graph_height:
+                    draw_height = max_graph_height
+                    draw_width = draw_height / aspect if aspect > 0 else draw_width
+
+                if y_pos - draw_height < MARGIN: # Check if graph fits
+                    c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN # Start new page
+                    y_pos -= 0.3*cm # Space at top
+
+                c.drawImage(graph1_img, MARGIN, y_pos - draw_height,
+                            width=draw_width, height=draw_height, preserveAspectRatio=True, mask='auto')
+                y_pos -= (draw_height + 0.6*cm) # Move below graph
+            except Exception as graph1_err:
+                print(f"Error drawing category graph: {graph1_err}")
+                if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                c.drawString(MARGIN, y_pos, "[Category graph could not be rendered]")
+                y_pos -= 0.6 * cm
+        elif isinstance(category_data, dict) and category_data:
+            try:
+                y_pos = draw_native_chart(c, category_data, y_pos, 7*cm, GREENS)
+            except Exception as graph1_err:
+                print(f"Error drawing category graph: {graph1_err}")
+                if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                c.drawString(MARGIN, y_pos, "[Category graph could not be rendered]")
+                y_pos -= 0.6 * cm
+
+        # --- Section 2: Top Emitting Activities (Text) ---
+        if y_pos < MARGIN + 3*cm : # Check space
+             c.showPage(); y_pos = height - MARGIN
+
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(MARGIN, y_pos, "Top Emitting Activities:")
+        c.setFont("Helvetica", 9.5)
+        y_pos -= 0.6 * cm
+
+        # Handle data format
+        if isinstance(top_activities_data, pd.DataFrame):
+            top_activities_dict = dict(zip(top_activities_data.iloc[:,0], top_activities_data.iloc[:,1]))
+        elif isinstance(top_activities_data, dict):
+            top_activities_dict = top_activities_data
+        else:
+            top_activities_dict = {}
+
+        if top_activities_dict:
+            for activity_key, emission in top_activities_dict.items():
+                if y_pos < MARGIN + 1*cm:
+                    c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                emission_val = emission if isinstance(emission, (int, float)) else 0
+                display_name = activity_label(activity_key)
+                display_name = (display_name[:45] + '...') if len(display_name) > 48 else display_name
+                c.drawString(MARGIN + 0.5*cm, y_pos, f"• {display_name}: {emission_val:.2f} kg {CO2_SUB}") # Use subscript
+                y_pos -= 0.55 * cm
+        else:
+            if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+            c.drawString(MARGIN + 0.5*cm, y_pos, "Top activities data unavailable.")
+            y_pos -= 0.55*cm
+
+        # --- Draw Top Activities Graph (fig2) ---
+        y_pos -= 0.4 * cm # Space before graph
+        if fig2_img_data:
+            try:
+                graph2_img = ImageReader(fig2_img_data)
+                img_w, img_h = graph2_img.getSize()
+                aspect = img_h / float(img_w) if img_w > 0 else 1
+                draw_width = width - (2 * MARGIN)
+                draw_height = draw_width * aspect
+                max_graph_height = 7.5*cm # Limit height
+                if draw_height > max_graph_height:
+                    draw_height = max_graph_height
+                    draw_width = draw_height / aspect if aspect > 0 else draw_width
+
+                if y_pos - draw_height < MARGIN: # Check space
+                    c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                    y_pos -= 0.3*cm # Space at top
+
+                c.drawImage(graph2_img, MARGIN, y_pos - draw_height,
+                            width=draw_width, height=draw_height, preserveAspectRatio=True, mask='auto')
+                # No need to decrease y_pos further after the last element
+            except Exception as graph2_err:
+                print(f"Error drawing top activities graph: {graph2_err}")
+                if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                c.drawString(MARGIN, y_pos, "[Top Activities graph could not be rendered]")
+        elif top_activities_dict:
+            try:
+                named = {activity_label(k): v for k, v in top_activities_dict.items()}
+                draw_native_chart(c, named, y_pos, 7.5*cm, BLUES)
+            except Exception as graph2_err:
+                print(f"Error drawing top activities graph: {graph2_err}")
+                if y_pos < MARGIN + 1*cm: c.showPage(); c.setFont("Helvetica", 9.5); y_pos = height - MARGIN
+                c.drawString(MARGIN, y_pos, "[Top Activities graph could not be rendered]")
+
+        # --- Finalize PDF ---
+        c.save()
+        buffer.seek(0)
+        return buffer
+
+    except Exception as pdf_err:
+        print(f"Critical error during PDF generation: {pdf_err}")
+        print(traceback.format_exc())
+        buffer = BytesIO() # Return empty buffer on failure
+        buffer.seek(0)
+        return buffer
+
+
+# --- Render Cache ---
+class LRUCache:
+    """Small thread-safe LRU map shared by all sessions of the server process."""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build, keep=None):
+        """Cached value for ``key``, else ``build()``; results failing ``keep(value)`` are returned but not stored."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = build()  # outside the lock: rendering takes seconds
+        if keep is not None and not keep(value):
+            return value
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+
+_chart_cache = LRUCache(maxsize=64)
+_pdf_cache = LRUCache(maxsize=64)
+
+
+def report_fingerprint(category_totals, top_activities):
+    """Stable hash of everything the charts and the PDF are drawn from."""
+    payload = {
+        "categories": sorted((str(k), round(float(v), 6)) for k, v in category_totals.items()),
+        "top": [(str(k), round(float(v), 6)) for k, v in top_activities.items()],
+    }
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def cached_chart_pngs(fingerprint, fig1, fig2, scale=2):
+    """PNG bytes of both charts, rendered by kaleido only once per fingerprint."""
+    def export():
+        with metrics.span("report.kaleido_export"):
+            return fig1.to_image(format="png", scale=scale), fig2.to_image(format="png", scale=scale)
+
+    return _chart_cache.get_or_build(fingerprint, export)
+
+
+def cached_pdf(key, build):
+    """PDF bytes for ``key``, calling ``build()`` only on a cache miss.
+
+    ``generate_pdf_report`` signals a failure with an empty buffer; empty results are not cached,
+    so the next download tries again.
+    """
+    return _pdf_cache.get_or_build(key, build, keep=bool)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Render a GreenPrint PDF report for every user in a scored results file.
+
+The input is the output of ``footprint_engine.py`` (one row per user with a
+column per activity, in kg CO2). Rows are read in chunks, rendered in a
+process pool with the same ``report.generate_pdf_report`` layout as the
+Breakdown page, and each finished PDF is written straight to a directory or
+a zip archive, so only the reports in flight are held in memory.
+
+    python report_batch.py scored.csv reports/ --id-col user_id
+    python report_batch.py scored.parquet reports.zip --id-col user_id --workers 8
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+
+import pandas as pd
+
+from footprint_engine import ACTIVITIES, read_chunks
+from report import category_totals_for, generate_pdf_report, top_activities_for
+
+DEFAULT_LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "GreenPrint_logo.png")
+
+_worker_logo = None
+
+
+# --- Worker process ---
+def _init_worker(logo_bytes):
+    global _worker_logo
+    _worker_logo = logo_bytes
+
+
+def render_report(user_id, emissions, top_n=10):
+    """(user_id, PDF bytes) for one user's {activity: kg CO2} emissions."""
+    category_totals = category_totals_for(emissions)
+    top_activities = top_activities_for(emissions, top_n)
+    logo_data = BytesIO(_worker_logo) if _worker_logo else None
+    return user_id, generate_pdf_report(logo_data, category_totals, top_activities).getvalue()
+
+
+# --- Input ---
+def iter_user_emissions(path, id_col, chunksize=10_000):
+    """Yield (user_id, {activity: emissions}) per row, skipping empty/NaN activities.
+
+    Non-numeric cells count as missing. ``emissions`` is None for a row without a single
+    numeric activity, which is how ``footprint_engine`` scores a country it has no factors for.
+    """
+    for chunk in read_chunks(path, chunksize=chunksize):
+        if id_col not in chunk.columns:
+            raise ValueError(f"Input has no '{id_col}' column (use --id-col).")
+        activities = [a for a in ACTIVITIES if a in chunk.columns]
+        values = chunk[activities].apply(pd.to_numeric, errors="coerce")
+        for user_id, row in zip(chunk[id_col], values.itertuples(index=False, name=None)):
+            if all(pd.isna(v) for v in row):
+                yield str(user_id), None
+                continue
+            yield str(user_id), {a: float(v) for a, v in zip(activities, row) if not pd.isna(v) and v > 0}
+
+
+def report_name(user_id):
+    """File name for a user's report: ``<user_id>.pdf`` with anything outside ``[A-Za-z0-9_.-]`` replaced.
+
+    Path separators, ``..`` and leading dots are neutralised, so an id can never point outside the
+    output directory or archive.
+    """
+    safe = re.sub(r"\.{2,}", "_", re.sub(r"[^\w.-]", "_", str(user_id), flags=re.ASCII)).lstrip(".")
+    return f"{safe or '_'}.pdf"
+
+
+# --- Output ---
+class ReportWriter:
+    """Writes ``<user_id>.pdf`` into a directory, or into a zip if ``path`` ends in ``.zip``.
+
+    Names come from ``report_name``; an id whose name is already taken (a repeated id, or two ids
+    that sanitise alike) gets a ``-2``, ``-3``, ... suffix instead of overwriting the earlier report.
+    """
+
+    def __init__(self, path):
+        self.bytes_written = 0
+        self._names = set()
+        self._zip = None
+        if path.endswith(".zip"):
+            self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def write(self, user_id, pdf_bytes):
+        """Write one report; returns the file name used."""
+        name = report_name(user_id)
+        stem, n = name[:-len(".pdf")], 1
+        while name.lower() in self._names:  # lower(): case-insensitive file systems collide too
+            n += 1
+            name = f"{stem}-{n}.pdf"
+        self._names.add(name.lower())
+        if self._zip is not None:
+            self._zip.writestr(name, pdf_bytes)
+        else:
+            with open(os.path.join(self.path, name), "wb") as f:
+                f.write(pdf_bytes)
+        self.bytes_written += len(pdf_bytes)
+        return name
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_all(in_path, out_path, id_col="user_id", logo_path=DEFAULT_LOGO, workers=None, top_n=10,
+               chunksize=10_000, log=print):
+    """Render every user's report; returns a summary dict with throughput."""
+    logo_bytes = None
+    if logo_path and os.path.exists(logo_path):
+        with open(logo_path, "rb") as f:
+            logo_bytes = f.read()
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4  # keeps every worker busy without queueing the whole file
+
+    summary = {"reports": 0, "empty": 0, "unscored": 0, "renamed": 0, "failed": 0}
+    start = time.perf_counter()
+    with ReportWriter(out_path) as writer, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(logo_bytes,)) as pool:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                user_id, pdf_bytes = future.result()
+                if not pdf_bytes:
+                    summary["failed"] += 1
+                    log(f"failed: {user_id}")
+                    continue
+                name = writer.write(user_id, pdf_bytes)
+                if name != report_name(user_id):
+                    summary["renamed"] += 1
+                    log(f"duplicate name: {user_id} written as {name}")
+                summary["reports"] += 1
+
+        for user_id, emissions in iter_user_emissions(in_path, id_col, chunksize):
+            if emissions is None:
+                summary["unscored"] += 1
+                log(f"no report: {user_id} has no scored activities (country without emission factors?)")
+                continue
+            if not emissions:
+                summary["empty"] += 1
+                log(f"no report: {user_id} has no positive emissions")
+                continue
+            pending.add(pool.submit(render_report, user_id, emissions, top_n))
+            if len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+        drain(ALL_COMPLETED)
+
+    elapsed = time.perf_counter() - start
+    summary.update(
+        seconds=round(elapsed, 2),
+        reports_per_s=round(summary["reports"] / max(elapsed, 1e-9), 1),
+        mb_written=round(writer.bytes_written / 1e6, 2),
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a PDF report per user from scored emissions.")
+    parser.add_argument("input", help="CSV or Parquet output of footprint_engine.py")
+    parser.add_argument("output", help="Directory to write <id>.pdf files to, or a .zip file")
+    parser.add_argument("--id-col", default="user_id", help="Column used as the report file name")
+    parser.add_argument("--logo", default=DEFAULT_LOGO, help="PNG logo for the report header")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--top-n", type=int, default=10, help="Activities listed in the top-emitters chart")
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    summary = render_all(args.input, args.output, id_col=args.id_col, logo_path=args.logo, workers=args.workers,
+                         top_n=args.top_n, chunksize=args.chunksize, log=lambda msg: print(msg, file=sys.stderr))
+    print(", ".join(f"{key}={value}" for key, value in summary.items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
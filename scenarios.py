@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""What-if scenarios: many alternative footprints from one matrix product.
+
+A scenario is a linear change to a user's quantity vector: scale an activity,
+or move a share of one activity to another (1:1 in the input units, e.g. km of
+petrol car become km of train). Each scenario is compiled once into an n x n
+transform ``T`` with ``new_quantities = quantities @ T``, and all of them are
+stacked into ``TRANSFORMS`` (S x n x n). For a country's factor vector ``f``
+``TRANSFORMS @ f`` has one row per scenario, so every scenario's total for a
+user (or a batch of users) is a single product with the quantity vector.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from taxonomy import ACTIVITY_IDS, BY_ID
+
+
+class Scenario(NamedTuple):
+    label: str
+    changes: tuple  # scale(...) / swap(...) steps, applied in order
+
+
+def scale(activity, factor):
+    """Multiply ``activity`` by ``factor`` (0.5 halves it, 0 drops it)."""
+    return ("scale", activity, float(factor))
+
+
+def swap(from_activity, to_activity, share=1.0):
+    """Move ``share`` of ``from_activity``'s quantity to ``to_activity``."""
+    return ("swap", from_activity, to_activity, float(share))
+
+
+DEFAULT_SCENARIOS = (
+    Scenario("Swap the petrol car for the electric train", (swap("Petrol_car", "Electric_train"),)),
+    Scenario("Swap the petrol car for the bus", (swap("Petrol_car", "Bus"),)),
+    Scenario("Switch from a petrol to an electric car", (swap("Petrol_car", "Ev_car"),)),
+    Scenario("Swap the diesel car for the electric train", (swap("Diesel_car", "Electric_train"),)),
+    Scenario("Switch from a diesel to an electric car", (swap("Diesel_car", "Ev_car"),)),
+    Scenario("Replace the motorcycle with an e-scooter", (swap("Motorcycle", "Ev_scooter"),)),
+    Scenario("Take the train instead of domestic flights", (swap("Domestic_flight", "Electric_train"),)),
+    Scenario("Halve international flights", (scale("International_flight", 0.5),)),
+    Scenario("Take electric instead of diesel local trains", (swap("Diesel_train_local", "Electric_train"),)),
+    Scenario("Halve your beef", (scale("Beef", 0.5),)),
+    Scenario("Replace beef with poultry", (swap("Beef", "Poultry"),)),
+    Scenario("Replace beef with plant-based food", (swap("Beef", "Other_food"),)),
+    Scenario("Replace pork with poultry", (swap("Pork", "Poultry"),)),
+    Scenario("Halve other meat", (scale("Other_meat", 0.5),)),
+    Scenario("Cut dairy by a third", (scale("Dairy", 2 / 3),)),
+    Scenario("Cut electricity use by 20%", (scale("Electricity", 0.8),)),
+    Scenario("Cut water use by 20%", (scale("Water", 0.8),)),
+    Scenario("Halve hotel nights", (scale("Hotel_stay", 0.5),)),
+    Scenario("Train instead of the petrol car, and halve your beef",
+             (swap("Petrol_car", "Electric_train"), scale("Beef", 0.5))),
+)
+
+
+# --- Compilation ---
+def _index(activity):
+    try:
+        return BY_ID[activity].index
+    except KeyError:
+        raise ValueError(f"Unknown activity in scenario: {activity!r}") from None
+
+
+def compile_transforms(scenarios):
+    """(S x n x n) stack of quantity transforms, one per scenario."""
+    n = len(ACTIVITY_IDS)
+    transforms = np.repeat(np.eye(n)[np.newaxis], len(scenarios), axis=0)
+    for transform, scenario in zip(transforms, scenarios):
+        for change in scenario.changes:
+            step = np.eye(n)
+            if change[0] == "scale":
+                step[_index(change[1]), _index(change[1])] = change[2]
+            elif change[0] == "swap":
+                src, dst, share = _index(change[1]), _index(change[2]), change[3]
+                step[src, src] -= share
+                step[src, dst] += share
+            else:
+                raise ValueError(f"Unknown scenario change: {change[0]!r}")
+            transform[:] = transform @ step
+    return transforms
+
+
+TRANSFORMS = compile_transforms(DEFAULT_SCENARIOS)
+TRANSFORMS.setflags(write=False)
+
+
+# --- Evaluation ---
+def evaluate(quantities, factors, scenarios=DEFAULT_SCENARIOS, transforms=None):
+    """Scenario totals for registry-ordered ``quantities``: shape (S,), or (users, S) for a 2-D batch.
+
+    ``factors`` may contain NaN for activities without a factor. Those count as zero while the
+    quantity is untouched, but a scenario that moves quantity into or out of such an activity has
+    no meaningful total and comes back as NaN.
+    """
+    if transforms is None:
+        transforms = TRANSFORMS if scenarios is DEFAULT_SCENARIOS else compile_transforms(scenarios)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    factors = np.asarray(factors, dtype=np.float64)
+    gaps = np.isnan(factors)
+    scenario_factors = transforms @ np.nan_to_num(factors, nan=0.0)  # (S x n): factor per unit of original input
+    totals = quantities @ scenario_factors.T
+    if gaps.any():
+        new_quantities = quantities @ transforms  # (S x n), or (S x users x n) for a batch
+        unknown = ((new_quantities != quantities) & gaps).any(axis=-1)
+        totals = np.where(unknown.T, np.nan, totals)
+    return totals
+
+
+def rank_savings(quantities, factors, scenarios=DEFAULT_SCENARIOS, top_n=5):
+    """The ``top_n`` scenarios that lower the footprint most, as dicts sorted by saving.
+
+    Scenarios touching an activity whose factor is NaN are left out (see ``evaluate``).
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    base_total = float(quantities @ np.nan_to_num(np.asarray(factors, dtype=np.float64), nan=0.0))
+    savings = base_total - evaluate(quantities, factors, scenarios)
+    savings = np.where(np.isnan(savings), -np.inf, savings)
+    order = np.argsort(-savings, kind="stable")[:top_n]
+    return [
+        {
+            "label": scenarios[i].label,
+            "total": base_total - float(savings[i]),
+            "saving": float(savings[i]),
+            "saving_pct": 100.0 * float(savings[i]) / base_total if base_total > 0 else 0.0,
+        }
+        for i in order if savings[i] > 1e-9
+    ]
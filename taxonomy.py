@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""The calculator's activity taxonomy, built once at import.
+
+Every activity has an id (the emission factor CSV's ``Activity`` value and the
+session/input key), a display label, a category and a fixed integer index.
+Per-activity arrays in ``footprint_engine`` and the pages are ordered by that
+index, so category totals are one ``np.bincount`` over ``CATEGORY_INDEX``.
+"""
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Activity(NamedTuple):
+    id: str
+    label: str
+    category: str
+    index: int
+
+
+# --- Definitions: (category key, category label, ((activity id, activity label), ...)) ---
+_DEFINITIONS = (
+    ("transport", "Travel", (
+        ("Domestic_flight", "Domestic Flights"), ("International_flight", "International Flights"),
+        ("Diesel_train_local", "Diesel Local Train"), ("Diesel_train_long", "Diesel Long-Dist Train"),
+        ("Electric_train", "Electric Train"), ("Bus", "Bus"),
+        ("Petrol_car", "Petrol Car"), ("Ev_car", "Electric Car"),
+        ("Ev_scooter", "E-Scooter"), ("Motorcycle", "Motorcycle"),
+        ("Diesel_car", "Diesel Car"),
+    )),
+    ("food", "Food", (
+        ("Beef", "Beef Products"), ("Poultry", "Poultry Products"),
+        ("Pork", "Pork Products"), ("Dairy", "Dairy Products"),
+        ("Fish_products", "Fish Products"), ("Rice", "Rice"),
+        ("Sugar", "Sugar"), ("Oils_fats", "Veg Oils/Fats"),
+        ("Other_food", "Other Food"), ("Beverages", "Beverages"),
+        ("Other_meat", "Other Meat Products"),
+    )),
+    ("energy", "Energy & Water", (("Electricity", "Electricity"), ("Water", "Water"))),
+    ("hotel", "Other", (("Hotel_stay", "Hotel Stay"),)),
+)
+
+# --- Registry ---
+REGISTRY = tuple(
+    Activity(activity_id, label, category, index)
+    for index, (activity_id, label, category) in enumerate(
+        (activity_id, label, category)
+        for category, _, activities in _DEFINITIONS
+        for activity_id, label in activities
+    )
+)
+ACTIVITY_IDS = tuple(activity.id for activity in REGISTRY)
+BY_ID = MappingProxyType({activity.id: activity for activity in REGISTRY})
+LABELS = MappingProxyType({activity.id: activity.label for activity in REGISTRY})
+
+CATEGORY_KEYS = tuple(category for category, _, _ in _DEFINITIONS)
+CATEGORY_LABELS = MappingProxyType({category: label for category, label, _ in _DEFINITIONS})
+CATEGORIES = MappingProxyType({
+    category: tuple(activity_id for activity_id, _ in activities) for category, _, activities in _DEFINITIONS
+})
+
+# Category position of each activity, by activity index
+CATEGORY_INDEX = np.array([CATEGORY_KEYS.index(activity.category) for activity in REGISTRY], dtype=np.intp)
+CATEGORY_INDEX.setflags(write=False)
+
+
+def activity_label(activity_id):
+    """Display label, e.g. "Ev_car" -> "Electric Car"; unknown ids are prettified."""
+    label = LABELS.get(activity_id)
+    return label if label is not None else activity_id.replace("_", " ").capitalize()
+
+
+def to_vector(values, default=0.0):
+    """{activity id: value} -> float array in registry order."""
+    return np.array([float(values.get(activity_id, default)) for activity_id in ACTIVITY_IDS])
+
+
+def category_totals(vector):
+    """Per-category sums (in ``CATEGORY_KEYS`` order) of a registry-ordered vector."""
+    return np.bincount(CATEGORY_INDEX, weights=np.asarray(vector, dtype=np.float64), minlength=len(CATEGORY_KEYS))
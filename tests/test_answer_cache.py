@@ -0,0 +1,23 @@
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+
+from greenprint_ai.cache import AnswerCache
+
+
+def _history(*turns):
+    roles = [MessageRole.USER, MessageRole.ASSISTANT]
+    return [ChatMessage(role=roles[i % 2], content=text) for i, text in enumerate(turns)]
+
+
+def test_follow_up_is_not_served_across_conversations():
+    cache = AnswerCache()
+    flights = _history("How do I cut flight emissions?", "Take the train.")
+    beef = _history("Is beef bad?", "Yes, it has a high footprint.")
+    cache.store(["n1"], "why?", [1.0, 0.0], "Trains emit less per km.", flights)
+    assert cache.lookup(["n1"], "why?", [1.0, 0.0], beef) is None
+    assert cache.lookup(["n1"], "Why", [1.0, 0.0], flights) == "Trains emit less per km."
+
+
+def test_first_turns_are_shared_between_sessions():
+    cache = AnswerCache()
+    cache.store(["n1", "n2"], "How do I reduce flights?", [0.0, 1.0], "Fly less.")
+    assert cache.lookup(["n1", "n2"], "how do i reduce flights", [0.0, 1.0], []) == "Fly less."
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from cohort_cube import CohortCube, age_band
+
+
+@pytest.fixture(scope="module")
+def population():
+    rng = np.random.default_rng(7)
+    n = 5000
+    countries = rng.choice(["Germany", "France"], n, p=[0.7, 0.3])
+    ages = rng.integers(16, 80, n)
+    genders = rng.choice(["Female", "Male"], n)
+    totals = rng.lognormal(np.log(400), 0.6, n)
+    cube = CohortCube()
+    for start in range(0, n, 1000):  # several batches, like the history writer
+        batch = slice(start, start + 1000)
+        cube.add_many(countries[batch], ages[batch], genders[batch], totals[batch])
+    return cube, countries, ages, genders, totals
+
+
+def test_stats_match_numpy(population):
+    cube, countries, _, _, totals = population
+    german = totals[countries == "Germany"]
+    stats = cube.stats("Germany")
+    assert stats["count"] == len(german)
+    assert stats["mean"] == pytest.approx(german.mean())
+    assert stats["std"] == pytest.approx(german.std())
+    assert len(cube) == len(totals)
+
+
+@pytest.mark.parametrize("value", [50.0, 200.0, 400.0, 800.0, 3000.0])
+def test_percentile_matches_numpy(population, value):
+    cube, _, _, _, totals = population
+    assert cube.percentile(value) == pytest.approx(100.0 * np.mean(totals <= value), abs=1.0)
+
+
+@pytest.mark.parametrize("q", [0.05, 0.25, 0.5, 0.75, 0.95])
+def test_quantile_is_within_one_bin_of_numpy(population, q):
+    cube, _, _, _, totals = population
+    assert cube.quantile(q) == pytest.approx(np.quantile(totals, q), rel=0.05)
+
+
+def test_cell_filters_every_dimension(population):
+    cube, countries, ages, genders, totals = population
+    bands = np.array([age_band(age) for age in ages])
+    mask = (countries == "France") & (bands == "25-34") & (genders == "Female")
+    assert cube.stats("France", "25-34", "Female")["count"] == mask.sum()
+    assert cube.stats(None, "25-34", None)["count"] == (bands == "25-34").sum()
+
+
+def test_best_cell_rolls_up_to_a_cell_with_enough_footprints():
+    cube = CohortCube()
+    rows = [("Germany", 30, "Female")] * 30 + [("Germany", 50, "Male")] * 25 + [("Germany", 30, "Male")] * 2 \
+        + [("Spain", 30, "Male")] * 3
+    countries, ages, genders = zip(*rows)
+    cube.add_many(countries, ages, genders, np.full(len(rows), 300.0))
+    assert cube.best_cell("Germany", "25-34", "Female") == ("Germany", "25-34", "Female")
+    assert cube.best_cell("Germany", "45-54", "Female") == ("Germany", "45-54", None)
+    assert cube.best_cell("Germany", "65+", "Male") == ("Germany", None, "Male")
+    assert cube.best_cell("Germany", "65+", "Other") == ("Germany", None, None)
+    assert cube.best_cell("Spain", "25-34", "Male") == (None, None, None)  # only 3 in Spain
+    assert cube.best_cell("Spain", "25-34", "Male", min_count=100) is None
+
+
+def test_empty_cells_return_none(tmp_path):
+    cube = CohortCube.from_history(str(tmp_path / "missing.sqlite3"))
+    assert len(cube) == 0
+    assert cube.stats() is None and cube.percentile(100.0) is None and cube.quantile(0.5) is None
@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_cache
+
+CSV_V1 = b"Activity,Germany,France\nBeef,27.0,26.0\nWater,,0.3\n"
+CSV_V2 = b"Activity,Germany,France\nBeef,28.5,26.0\nWater,0.4,0.3\n"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "DATA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(data_cache, "_last_checked", {})
+    monkeypatch.setattr(data_cache, "_refreshing", set())
+    source = tmp_path / "factors.csv"
+    source.write_bytes(CSV_V1)
+    return source
+
+
+def test_snapshot_round_trips_numeric_text_and_gaps(cache):
+    df = data_cache.load_table("factors", str(cache), refresh=False)
+    expected = pd.read_csv(cache)
+    assert list(df.columns) == ["Activity", "Germany", "France"]
+    assert list(df["Activity"]) == ["Beef", "Water"]
+    np.testing.assert_array_equal(df[["Germany", "France"]].to_numpy(), expected[["Germany", "France"]].to_numpy())
+    assert np.isnan(df.loc[1, "Germany"])
+
+
+def test_changed_upstream_switches_current_and_keeps_the_previous_version(cache):
+    data_cache.load_table("factors", str(cache), refresh=False)
+    first = data_cache.current_version("factors")
+    assert data_cache.refresh_table("factors", str(cache)) is False
+    cache.write_bytes(CSV_V2)
+    assert data_cache.refresh_table("factors", str(cache)) is True
+    second = data_cache.current_version("factors")
+    assert second != first
+    assert data_cache.load_table("factors", str(cache), refresh=False).loc[0, "Germany"] == 28.5
+    assert data_cache._read_snapshot("factors", first).loc[0, "Germany"] == 27.0  # still readable
+
+
+def test_failed_fetch_falls_back_to_the_snapshot(cache, monkeypatch, capsys):
+    data_cache.load_table("factors", str(cache), refresh=False)
+    monkeypatch.setattr(data_cache, "_fetch", lambda url: (_ for _ in ()).throw(OSError("offline")))
+    monkeypatch.setattr(data_cache, "REFRESH_INTERVAL", 0)
+    df = data_cache.load_table("factors", str(cache))  # starts a check, which fails
+    assert df.loc[0, "Germany"] == 27.0
+    for thread in threading.enumerate():
+        if thread.name == "refresh-factors":
+            thread.join(10)
+    assert "offline" in capsys.readouterr().out
+    assert data_cache.load_table("factors", str(cache), refresh=False).loc[0, "Germany"] == 27.0
+
+
+def test_upstream_is_checked_again_once_the_interval_has_passed(cache, monkeypatch):
+    data_cache.load_table("factors", str(cache))
+    assert data_cache._refresh_in_background("factors", str(cache)) is None  # just fetched
+    cache.write_bytes(CSV_V2)
+    monkeypatch.setattr(data_cache, "REFRESH_INTERVAL", 0)
+    data_cache._refresh_in_background("factors", str(cache)).join(10)
+    assert data_cache.load_table("factors", str(cache), refresh=False).loc[0, "Germany"] == 28.5
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from footprint_engine import (ACTIVITIES, FootprintState, activity_factors, build_factor_matrix, country_sweep,
+                              score_user)
+
+
+def _factor_matrix():
+    # Spain has no Beef factor; everything else is complete
+    df_emis = pd.DataFrame({
+        "Activity": ["Petrol_car", "Beef", "Electricity"],
+        "Germany": [0.20, 27.0, 0.40],
+        "France": [0.19, 26.0, 0.06],
+        "Spain": [0.18, np.nan, 0.20],
+    })
+    return build_factor_matrix(df_emis)
+
+
+def _quantities(**values):
+    quantities = np.zeros(len(ACTIVITIES))
+    for activity, value in values.items():
+        quantities[ACTIVITIES.index(activity)] = value
+    return quantities
+
+
+def test_missing_factor_stays_nan_in_matrix():
+    factors, activity_index, country_index = _factor_matrix()
+    assert np.isnan(factors[activity_index["Beef"], country_index["Spain"]])
+
+
+def test_country_sweep_leaves_out_countries_missing_a_used_factor():
+    sweep = country_sweep(_quantities(Petrol_car=100, Beef=2), _factor_matrix())
+    assert list(sweep.index) == ["France", "Germany"]
+    assert sweep["France"] == 100 * 0.19 + 2 * 26.0
+
+
+def test_country_sweep_keeps_countries_whose_gaps_are_unused():
+    sweep = country_sweep(_quantities(Petrol_car=100, Electricity=50), _factor_matrix())
+    assert sweep.index[0] == "France"
+    assert set(sweep.index) == {"Germany", "France", "Spain"}
+    assert sweep["Spain"] == 100 * 0.18 + 50 * 0.20
+
+
+def test_single_country_scoring_still_treats_gaps_as_zero():
+    factor_matrix = _factor_matrix()
+    spain = activity_factors(factor_matrix, ACTIVITIES, "Spain")
+    assert not np.isnan(spain).any()
+    assert score_user({"Beef": 2, "Petrol_car": 100}, factor_matrix, "Spain")["total"] == 100 * 0.18
+
+
+def test_clearing_every_input_returns_exactly_zero():
+    rng = np.random.default_rng(0)
+    state = FootprintState("Germany", rng.uniform(0.01, 30.0, len(ACTIVITIES)))
+    for _ in range(2000):
+        state.set_quantity(ACTIVITIES[rng.integers(len(ACTIVITIES))], rng.uniform(0.0, 1000.0))
+    for activity in ACTIVITIES:
+        state.set_quantity(activity, 0.0)
+    assert type(state.total) is float and state.total == 0.0
+    assert (state.category_totals == 0.0).all()
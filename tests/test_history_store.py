@@ -0,0 +1,36 @@
+import hashlib
+import os
+import stat
+
+import history_store
+from history_store import anonymous_user_key, history_salt
+
+
+def test_salt_is_random_per_install_and_private(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_SALT", None)
+    first = history_salt(str(tmp_path / "a" / "history.sqlite3"))
+    other = history_salt(str(tmp_path / "b" / "history.sqlite3"))
+    assert len(first) == 32 and first != other
+    assert stat.S_IMODE(os.stat(tmp_path / "a" / "history.sqlite3.salt").st_mode) == 0o600
+
+
+def test_salt_survives_a_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_SALT", None)
+    path = str(tmp_path / "history.sqlite3")
+    salt = history_salt(path)
+    history_store._salts.clear()
+    assert history_salt(path) == salt
+
+
+def test_user_key_is_not_the_public_salt_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_SALT", None)
+    salt = history_salt(str(tmp_path / "history.sqlite3"))
+    key = anonymous_user_key(" Ada@Example.org", salt)
+    assert key == anonymous_user_key("ada@example.org", salt)
+    assert key != hashlib.sha256(b"greenprint:ada@example.org").hexdigest()[:32]
+
+
+def test_configured_salt_takes_precedence(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_SALT", "from-the-environment")
+    assert history_salt(str(tmp_path / "history.sqlite3")) == b"from-the-environment"
+    assert not (tmp_path / "history.sqlite3.salt").exists()
@@ -0,0 +1,51 @@
+import json
+import os
+import shutil
+
+from llama_index.core import MockEmbedding
+
+from greenprint_ai.ingest import DOC_ID_PREFIX, ingest, migrate_legacy_ids
+from greenprint_ai.resources import PERSIST_DIR
+
+
+def _quiet(*args):
+    pass
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_reingest_is_stable_across_source_dir_spellings_and_prune_removes_deleted_files(tmp_path, monkeypatch):
+    source, index = tmp_path / "docs", str(tmp_path / "index")
+    _write(str(source / "a.txt"), "Trains emit less than planes.")
+    _write(str(source / "sub" / "b.txt"), "Beef has a large footprint.")
+    embed = MockEmbedding(embed_dim=8)
+
+    first = ingest(str(source), embed, persist_dir=index, log=_quiet)
+    assert first["added"] == 2
+    monkeypatch.chdir(tmp_path)
+    assert ingest("./docs/", embed, persist_dir=index, log=_quiet)["unchanged"] == 2
+
+    os.remove(source / "sub" / "b.txt")
+    pruned = ingest("docs", embed, persist_dir=index, prune=True, log=_quiet)
+    assert (pruned["unchanged"], pruned["removed"]) == (1, 1)
+    with open(os.path.join(index, "docstore.json")) as f:
+        assert list(json.load(f)["docstore/ref_doc_info"]) == [f"{DOC_ID_PREFIX}a.txt"]
+
+
+def test_legacy_uuid_ids_are_rekeyed_from_file_name_and_page(tmp_path):
+    index = str(tmp_path / "index")
+    shutil.copytree(PERSIST_DIR, index)
+
+    mapping = migrate_legacy_ids(index, log=_quiet)
+    assert len(mapping) == 22
+    assert f"{DOC_ID_PREFIX}RAG_file.pdf#page=1" in mapping.values()
+    with open(os.path.join(index, "docstore.json")) as f:
+        docstore = json.load(f)
+    with open(os.path.join(index, "embedding_ids.json")) as f:
+        vector_refs = set(json.load(f)["ref_doc_ids"])
+    assert set(docstore["docstore/ref_doc_info"]) == set(mapping.values()) == vector_refs
+    assert migrate_legacy_ids(index, log=_quiet) == {}
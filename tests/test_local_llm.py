@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from greenprint_ai.local_llm import BatchScheduler, QueueFullError
+
+
+class BlockingGenerator:
+    """Echoes prompts; the first call waits for ``release`` so later prompts queue up behind it."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.batches = []
+
+    def __call__(self, prompts, max_new_tokens):
+        self.batches.append(list(prompts))
+        self.started.set()
+        assert self.release.wait(10)
+        return [prompt.upper() for prompt in prompts]
+
+
+def _busy_scheduler(**kwargs):
+    generator = BlockingGenerator()
+    scheduler = BatchScheduler(generator, batch_window=0.2, **kwargs)
+    first = scheduler.submit("first")
+    assert generator.started.wait(10)
+    return scheduler, generator, first
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 10
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_queued_prompts_are_generated_together():
+    scheduler, generator, first = _busy_scheduler(max_batch=3)
+    futures = [scheduler.submit(f"p{i}") for i in range(4)]
+    generator.release.set()
+    assert first.result(10) == "FIRST"
+    assert [future.result(10) for future in futures] == ["P0", "P1", "P2", "P3"]
+    assert generator.batches == [["first"], ["p0", "p1", "p2"], ["p3"]]
+    assert scheduler.stats()["batches"] == 3
+
+
+def test_full_queue_rejects_instead_of_waiting():
+    scheduler, generator, _ = _busy_scheduler(max_queue=2)
+    scheduler.submit("a")
+    scheduler.submit("b")
+    with pytest.raises(QueueFullError):
+        scheduler.submit("c")
+    assert scheduler.stats()["rejected"] == 1
+    generator.release.set()
+
+
+def test_timed_out_request_is_cancelled_and_skipped():
+    scheduler, generator, _ = _busy_scheduler()
+    with pytest.raises(TimeoutError):
+        scheduler.complete("abandoned", timeout=0.05)
+    kept = scheduler.submit("kept")
+    generator.release.set()
+    assert kept.result(10) == "KEPT"
+    _wait_for(lambda: scheduler.stats()["requests"] == 2)
+    assert generator.batches == [["first"], ["kept"]]
+    assert scheduler.stats()["cancelled"] == 1
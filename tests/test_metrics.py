@@ -0,0 +1,66 @@
+import json
+import urllib.request
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_snapshot_buckets_are_cumulative(registry):
+    for seconds in (0.0005, 0.003, 0.003, 0.2, 120.0):
+        registry.observe("stage", seconds)
+    h = registry.snapshot()["stage"]
+    assert h["count"] == 5 and h["max"] == 120.0
+    assert h["sum"] == pytest.approx(120.2065)
+    assert h["buckets"]["0.001"] == 1
+    assert h["buckets"]["0.0025"] == 1
+    assert h["buckets"]["0.005"] == 3
+    assert h["buckets"]["0.25"] == 4
+    assert h["buckets"]["60.0"] == 4
+    assert h["buckets"]["+Inf"] == 5
+    counts = list(h["buckets"].values())
+    assert counts == sorted(counts)
+
+
+def test_prometheus_text_format(registry):
+    registry.observe("report.pdf", 0.5)
+    lines = metrics.to_prometheus().splitlines()
+    assert lines[:2] == ["# HELP greenprint_span_seconds Wall time of instrumented GreenPrint stages.",
+                         "# TYPE greenprint_span_seconds histogram"]
+    assert 'greenprint_span_seconds_bucket{span="report.pdf",le="0.25"} 0' in lines
+    assert 'greenprint_span_seconds_bucket{span="report.pdf",le="0.5"} 1' in lines
+    assert 'greenprint_span_seconds_bucket{span="report.pdf",le="+Inf"} 1' in lines
+    assert lines[-2:] == ['greenprint_span_seconds_sum{span="report.pdf"} 0.500000',
+                          'greenprint_span_seconds_count{span="report.pdf"} 1']
+
+
+def test_span_is_a_no_op_when_disabled(registry, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    with metrics.span("stage"):
+        pass
+    assert registry.snapshot() == {}
+    assert metrics.serve() is None
+
+
+def test_endpoint_serves_both_formats(registry, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "_server", None)
+    with metrics.span("stage"):
+        pass
+    server = metrics.serve(port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            assert 'greenprint_span_seconds_count{span="stage"} 1' in response.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json", timeout=5) as response:
+            assert json.loads(response.read())["stage"]["count"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
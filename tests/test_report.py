@@ -0,0 +1,19 @@
+import report
+
+
+def test_failed_pdf_build_is_not_cached(monkeypatch):
+    monkeypatch.setattr(report, "_pdf_cache", report.LRUCache(maxsize=4))
+    builds = iter([b"", b"%PDF-1.4"])
+    assert report.cached_pdf("fingerprint", lambda: next(builds)) == b""
+    assert report.cached_pdf("fingerprint", lambda: next(builds)) == b"%PDF-1.4"
+    assert report.cached_pdf("fingerprint", lambda: b"rebuilt") == b"%PDF-1.4"
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = report.LRUCache(maxsize=2)
+    cache.get_or_build("a", lambda: 1)
+    cache.get_or_build("b", lambda: 2)
+    cache.get_or_build("a", lambda: None)  # hit: "a" becomes most recent
+    cache.get_or_build("c", lambda: 3)
+    assert cache.get_or_build("a", lambda: "rebuilt") == 1
+    assert cache.get_or_build("b", lambda: "rebuilt") == "rebuilt"
@@ -0,0 +1,60 @@
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from report_batch import ReportWriter, iter_user_emissions, render_all, report_name
+
+
+@pytest.mark.parametrize("user_id, name", [
+    ("u-17", "u-17.pdf"),
+    ("../../etc/passwd", "____etc_passwd.pdf"),
+    ("/tmp/evil", "_tmp_evil.pdf"),
+    ("..", "_.pdf"),
+    (".hidden", "hidden.pdf"),
+    ("a b/ü", "a_b__.pdf"),
+])
+def test_report_name_stays_inside_the_output(user_id, name):
+    assert report_name(user_id) == name
+    assert os.path.dirname(report_name(user_id)) == ""
+
+
+def test_zip_members_are_sanitised_and_never_overwritten(tmp_path):
+    path = str(tmp_path / "reports.zip")
+    with ReportWriter(path) as writer:
+        names = [writer.write(user_id, b"%PDF") for user_id in ("../a", "_a", "A", "a", "a")]
+    assert names == ["__a.pdf", "_a.pdf", "A.pdf", "a-2.pdf", "a-3.pdf"]
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == sorted(names)
+
+
+def test_directory_writer_keeps_files_inside(tmp_path):
+    out = tmp_path / "reports"
+    with ReportWriter(str(out)) as writer:
+        writer.write("../escape", b"%PDF")
+    assert os.listdir(out) == ["__escape.pdf"]
+    assert not (tmp_path / "escape.pdf").exists()
+
+
+def _scored(tmp_path):
+    path = tmp_path / "scored.csv"
+    pd.DataFrame({
+        "user_id": ["ok", "text", "unknown", "zero"],
+        "Beef": [54.0, "n/a", None, 0.0],
+        "Petrol_car": [20.0, 12.0, None, 0.0],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_non_numeric_cells_and_unscored_rows(tmp_path):
+    rows = dict(iter_user_emissions(_scored(tmp_path), "user_id"))
+    assert rows == {"ok": {"Beef": 54.0, "Petrol_car": 20.0}, "text": {"Petrol_car": 12.0}, "unknown": None, "zero": {}}
+
+
+def test_render_all_reports_users_without_a_report(tmp_path):
+    messages = []
+    summary = render_all(_scored(tmp_path), str(tmp_path / "out.zip"), logo_path=None, workers=1, log=messages.append)
+    assert (summary["reports"], summary["empty"], summary["unscored"], summary["failed"]) == (2, 1, 1, 0)
+    assert any("unknown" in message for message in messages)
+    assert any("zero" in message for message in messages)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from scenarios import DEFAULT_SCENARIOS, Scenario, evaluate, rank_savings, scale, swap
+from taxonomy import BY_ID, ACTIVITY_IDS
+
+
+def _vector(**values):
+    vector = np.zeros(len(ACTIVITY_IDS))
+    for activity, value in values.items():
+        vector[BY_ID[activity].index] = value
+    return vector
+
+
+def test_swap_into_an_activity_without_a_factor_is_left_out():
+    quantities = _vector(Petrol_car=500, Beef=4)
+    factors = _vector(Petrol_car=0.2, Beef=27.0, Poultry=6.0, Bus=0.1)
+    factors[BY_ID["Electric_train"].index] = np.nan
+    labels = [change["label"] for change in rank_savings(quantities, factors, top_n=len(DEFAULT_SCENARIOS))]
+    assert "Swap the petrol car for the electric train" not in labels
+    assert "Swap the petrol car for the bus" in labels
+    assert "Replace beef with poultry" in labels
+
+
+def test_untouched_gaps_count_as_zero():
+    quantities = _vector(Beef=4, Pork=2)
+    factors = _vector(Beef=27.0, Poultry=6.0)
+    factors[BY_ID["Pork"].index] = np.nan  # used, but no scenario below moves it
+    scenarios = (Scenario("beef to poultry", (swap("Beef", "Poultry"),)), Scenario("less pork", (scale("Pork", 0.5),)))
+    totals = evaluate(quantities, factors, scenarios)
+    assert totals[0] == 4 * 6.0
+    assert np.isnan(totals[1])
+
+
+def test_batch_marks_unknown_scenarios_per_user():
+    users = np.stack([_vector(Petrol_car=100), _vector(Beef=2)])
+    factors = _vector(Petrol_car=0.2, Beef=27.0, Poultry=6.0)
+    factors[BY_ID["Electric_train"].index] = np.nan
+    scenarios = (Scenario("train", (swap("Petrol_car", "Electric_train"),)),)
+    totals = evaluate(users, factors, scenarios)
+    assert totals.shape == (2, 1)
+    assert np.isnan(totals[0, 0]) and totals[1, 0] == 2 * 27.0
@@ -0,0 +1,50 @@
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+
+from greenprint_ai.sessions import SessionEnginePool
+
+
+def _pool(**kwargs):
+    return SessionEnginePool(lambda memory: object(), **kwargs)
+
+
+def test_same_id_gets_the_same_session_and_memory():
+    pool = _pool()
+    first = pool.get("a")
+    assert pool.get("a") is first
+    assert pool.get("b").memory is not first.memory
+
+
+def test_idle_sessions_are_evicted():
+    pool = _pool(idle_ttl=60)
+    stale, fresh = pool.get("stale"), pool.get("fresh")
+    stale.last_used -= 120
+    pool.get("other")
+    assert pool.stats() == {"sessions": 2, "max_sessions": 1000, "evictions": 1}
+    assert pool.get("fresh") is fresh
+    assert pool.get("stale") is not stale  # rebuilt with an empty history
+
+
+def test_least_recently_used_session_is_evicted_beyond_the_cap():
+    pool = _pool(max_sessions=2)
+    a = pool.get("a")
+    pool.get("b")
+    pool.get("a")  # "b" is now the least recently used
+    pool.get("c")
+    assert pool.stats()["evictions"] == 1
+    assert pool.get("a") is a
+    assert pool.stats()["evictions"] == 1  # "a" was still cached
+
+
+def test_trim_keeps_the_latest_messages_starting_on_a_user_turn():
+    pool = _pool(max_messages=4)
+    session = pool.get("a")
+    roles = [MessageRole.USER, MessageRole.ASSISTANT] * 3
+    for i, role in enumerate(roles):
+        session.memory.put(ChatMessage(role=role, content=f"m{i}"))
+    pool.trim(session)
+    assert [m.content for m in session.memory.get_all()] == ["m2", "m3", "m4", "m5"]
+
+    session.memory.put(ChatMessage(role=MessageRole.ASSISTANT, content="m6"))
+    pool.trim(session)  # the last 4 would start on an assistant turn
+    assert [m.content for m in session.memory.get_all()] == ["m4", "m5", "m6"]
+    assert session.memory.get_all()[0].role == MessageRole.USER
@@ -0,0 +1,56 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from greenprint_ai.ann import IVFIndex
+from greenprint_ai.vector_store import EMBEDDINGS_FNAME, MmapVectorStore, main
+
+
+def _write_simple_store(persist_dir, matrix):
+    ids = [f"node-{i}" for i in range(len(matrix))]
+    with open(os.path.join(persist_dir, "default__vector_store.json"), "w") as f:
+        json.dump({"embedding_dict": dict(zip(ids, matrix.tolist())), "text_id_to_ref_doc_id": {}}, f)
+
+
+def test_reconversion_rebuilds_the_ivf_index_for_the_new_matrix(tmp_path):
+    rng = np.random.default_rng(0)
+    _write_simple_store(tmp_path, rng.normal(size=(60, 8)))
+    main([str(tmp_path)])
+    store = MmapVectorStore.from_persist_dir(str(tmp_path), n_probe=4)
+    store.build_ann(n_lists=6)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+
+    _write_simple_store(tmp_path, rng.normal(size=(60, 8)))  # same size, different vectors
+    main([str(tmp_path)])
+
+    matrix = np.load(tmp_path / EMBEDDINGS_FNAME)
+    saved = IVFIndex.load(str(tmp_path))
+    expected = IVFIndex.build(matrix, n_lists=6)
+    assert saved.n_lists == 6
+    np.testing.assert_allclose(saved.centroids, expected.centroids)
+    np.testing.assert_array_equal(saved.order, expected.order)
+
+
+def test_unchanged_store_keeps_its_loaded_ivf_index(tmp_path):
+    _write_simple_store(tmp_path, np.random.default_rng(1).normal(size=(40, 8)))
+    main([str(tmp_path)])
+    store = MmapVectorStore.from_persist_dir(str(tmp_path), n_probe=2)
+    built = store.build_ann(n_lists=4)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    reloaded = MmapVectorStore.from_persist_dir(str(tmp_path), n_probe=2)
+    np.testing.assert_array_equal(reloaded.ann.order, built.order)
+
+
+def test_exact_search_store_removes_the_stale_ivf_index_instead_of_rebuilding(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    _write_simple_store(tmp_path, rng.normal(size=(40, 8)))
+    main([str(tmp_path)])
+    IVFIndex.build(np.load(tmp_path / EMBEDDINGS_FNAME), n_lists=4).save(str(tmp_path))
+
+    store = MmapVectorStore.from_persist_dir(str(tmp_path), mmap=False)  # n_probe=0: exact search
+    monkeypatch.setattr(IVFIndex, "build", classmethod(lambda cls, *a, **k: pytest.fail("k-means rebuilt")))
+    store.delete_nodes(store.node_ids[:5])
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    assert IVFIndex.load(str(tmp_path)) is None
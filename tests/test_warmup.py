@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+import warmup
+
+
+def _warmup_with(monkeypatch, loader, ttl):
+    monkeypatch.setattr(warmup, "TASKS", {"data": loader})
+    monkeypatch.setattr(warmup, "TASK_TTL", {"data": ttl})
+    monkeypatch.setattr(warmup, "DEFERRED_TASKS", frozenset())
+    return warmup._Warmup()
+
+
+def test_expired_value_is_served_while_the_reload_blocks(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(None)
+        if len(calls) == 2:
+            assert release.wait(10)
+        return len(calls)
+
+    w = _warmup_with(monkeypatch, loader, ttl=0)
+    assert w.get("data", timeout=10) == 1
+    assert w.get("data", timeout=1) == 1  # expired: starts the reload and returns at once
+    reload = w._futures["data"]
+    assert w.get("data", timeout=1) == 1  # reload still running: no second reload, no waiting
+    assert w._futures["data"] is reload
+    release.set()
+    assert reload.result(timeout=10) == 2
+    assert w.get("data", timeout=1) == 2
+
+
+def test_failed_reload_keeps_the_previous_value(monkeypatch):
+    calls = []
+
+    def loader():
+        calls.append(None)
+        if len(calls) > 1:
+            raise OSError("upstream down")
+        return "good"
+
+    w = _warmup_with(monkeypatch, loader, ttl=0)
+    assert w.get("data", timeout=10) == "good"
+    assert w.get("data", timeout=1) == "good"
+    with pytest.raises(OSError):
+        w._futures["data"].result(timeout=10)
+    assert w.status()["data"]["state"] == "failed"
+    assert w.get("data", timeout=1) == "good"
+
+
+def test_failed_first_load_is_retried_by_get(monkeypatch):
+    calls = []
+
+    def loader():
+        calls.append(None)
+        if len(calls) == 1:
+            raise OSError("cold start failed")
+        return "loaded"
+
+    w = _warmup_with(monkeypatch, loader, ttl=3600)
+    with pytest.raises(OSError):
+        w._futures["data"].result(timeout=10)
+    assert w.get("data", timeout=10) == "loaded"
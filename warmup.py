@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Server-start warm-up of reference data and models.
+
+Home.py (and every page, as a no-op after the first call) calls ``start()``.
+That submits the loaders to one thread pool held in ``st.cache_resource``, so
+the downloads run concurrently once per server process instead of serially on
+the first visit to each page. Pages read results with ``get(name)``, which
+waits only for the one resource they need, and can show progress with
+``status()`` / ``is_ready(name)``.
+
+Deferred tasks are not started with the server but by their first ``get()``.
+By default these are the chatbot models (``chatbot_index,llm``), so torch, the
+embedder and a local LLM are only loaded once someone sends a chat message.
+``GREENPRINT_DEFER_WARMUP`` replaces that list (comma-separated); set it empty
+to prefetch everything at server start.
+"""
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+import metrics
+
+LOGO_URL = "https://raw.githubusercontent.com/keanyaoha/Calculator_test/main/GreenPrint_logo.png"
+PER_CAPITA_URL = "https://raw.githubusercontent.com/keanyaoha/Final_Project_WBS/main/per_capita_filtered_monthly.csv"
+
+
+# --- Loaders (run in worker threads: raise on failure, never call st.*) ---
+def load_reference_data():
+    """Emission factors, per-capita averages and their indexes: (df_emis, df_cap, factor_matrix, per_capita)."""
+    import data_cache
+    from footprint_engine import CSV_URL, PerCapitaIndex, build_factor_matrix
+
+    df_emis = data_cache.load_table("emission_factors", CSV_URL)
+    df_cap = data_cache.load_table("per_capita", PER_CAPITA_URL)
+    df_emis.columns = df_emis.columns.str.strip()
+    if "Activity" not in df_emis.columns:
+        raise ValueError("Emission data CSV is missing 'Activity' column.")
+    return df_emis, df_cap, build_factor_matrix(df_emis), PerCapitaIndex.from_frame(df_cap)
+
+
+def load_logo():
+    with urllib.request.urlopen(LOGO_URL, timeout=30) as response:
+        return response.read()
+
+
+def load_chatbot_index():
+    from greenprint_ai.resources import load_chatbot_index
+
+    return load_chatbot_index()
+
+
+def load_llm():
+    from greenprint_ai.resources import load_llm
+
+    return load_llm()
+
+
+def start_kaleido():
+    # Rendering a tiny figure starts kaleido's renderer process ahead of the first PDF;
+    # only needed when the PDF embeds Plotly PNGs instead of native charts
+    from report import PDF_CHART_RENDERER
+    if PDF_CHART_RENDERER != "kaleido":
+        return False
+    import plotly.graph_objects as go
+
+    go.Figure().to_image(format="png", width=10, height=10)
+    return True
+
+
+TASKS = {
+    "reference_data": load_reference_data,
+    "logo": load_logo,
+    "chatbot_index": load_chatbot_index,
+    "llm": load_llm,
+    "kaleido": start_kaleido,
+}
+
+# Results older than this are reloaded in the background on the next get()
+TASK_TTL = {"reference_data": 3600, "logo": 3600}
+
+DEFAULT_DEFERRED = "chatbot_index,llm"
+DEFERRED_TASKS = frozenset(
+    name.strip() for name in os.environ.get("GREENPRINT_DEFER_WARMUP", DEFAULT_DEFERRED).split(",") if name.strip()
+)
+
+
+class _Warmup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(TASKS), thread_name_prefix="warmup")
+        self._futures = {}
+        self._results = {}  # name -> last successful result, served while a reload runs or after it fails
+        self._status = {}
+        for name in TASKS:
+            if name in DEFERRED_TASKS:
+                self._status[name] = {"state": "deferred", "seconds": None, "error": None, "finished_at": None}
+            else:
+                self._submit(name)
+
+    def _submit(self, name):
+        # finished_at stays that of the last good result, so a failed reload is retried once expired
+        previous = self._status.get(name, {}).get("finished_at")
+        self._status[name] = {"state": "pending", "seconds": None, "error": None, "finished_at": previous}
+        self._futures[name] = self._executor.submit(self._run, name)
+
+    def _run(self, name):
+        self._status[name]["state"] = "running"
+        start = time.perf_counter()
+        try:
+            with metrics.span(f"warmup.{name}"):
+                result = TASKS[name]()
+        except Exception as e:
+            self._status[name].update(state="failed", error=str(e), seconds=time.perf_counter() - start)
+            raise
+        with self._lock:
+            self._results[name] = result
+            self._status[name].update(state="ready", seconds=time.perf_counter() - start, finished_at=time.time())
+        return result
+
+    def get(self, name, timeout=None):
+        with self._lock:
+            if name not in self._futures:  # deferred task: first use starts it
+                self._submit(name)
+            future = self._futures[name]
+            status = self._status[name]
+            if name in self._results:
+                # Serve the last good value; an expired one starts a background reload (at most one at
+                # a time) and is replaced only when that reload succeeds
+                ttl = TASK_TTL.get(name)
+                if ttl is not None and future.done() and time.time() - status["finished_at"] > ttl:
+                    self._submit(name)
+                return self._results[name]
+            if status["state"] == "failed":  # never loaded: retry and wait
+                self._submit(name)
+                future = self._futures[name]
+        return future.result(timeout=timeout)
+
+    def status(self):
+        return {name: dict(status) for name, status in self._status.items()}
+
+
+@st.cache_resource(show_spinner=False)
+def _warmup():
+    return _Warmup()
+
+
+def start():
+    """Start warming every resource (idempotent, once per server process)."""
+    _warmup()
+    metrics.serve()  # no-op unless GREENPRINT_METRICS=1
+
+
+def get(name, timeout=None):
+    """Result of the warm-up task ``name``, waiting for it if it is still loading.
+
+    Re-raises the loader's exception if it has never succeeded (the next call retries). Once loaded,
+    an expired result keeps being served while it reloads in the background, and also if the reload fails.
+    """
+    return _warmup().get(name, timeout=timeout)
+
+
+def status():
+    """{task name: {"state", "seconds", "error", "finished_at"}} snapshot."""
+    return _warmup().status()
+
+
+def is_ready(name):
+    return status().get(name, {}).get("state") == "ready"